@@ -2,6 +2,7 @@
 FastAPI application setup.
 """
 import os
+import time
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -15,17 +16,28 @@ from src.routes import router, admin_router, interaction_router
 from src.rag_engine import initialize_qa_system
 from contextlib import asynccontextmanager
 from src.token_store import validate_token
+from src.interaction_tracker import flush_interactions
+from src.index_watcher import start_watcher, stop_watcher
+from src.config import WATCH_DATA_DIR, STARTUP_MODE, INDEX_READ_ONLY
+from src.metrics import stage_seconds
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for the FastAPI app.
-    Initializes QA system on startup.
+    Initializes QA system and the data folder watcher on startup, and stops the
+    watcher and flushes buffered interactions on shutdown.
     """
-    # Initialize QA system on startup
-    initialize_qa_system()
+    # Initialize QA system on startup; in background mode this returns right away
+    initialize_qa_system(background=STARTUP_MODE == "background")
+    # Read-only workers (WORKERS > 1) serve the index main.py built before starting them;
+    # nothing watches the data folder then, and document changes need a restart
+    if WATCH_DATA_DIR and not INDEX_READ_ONLY:
+        start_watcher()
     yield
-    # You could add cleanup here if needed
+    stop_watcher()
+    # Write interactions still waiting in the buffer
+    flush_interactions()
 
 # Create FastAPI app with lifespan management
 app = FastAPI(
@@ -50,11 +62,14 @@ async def validate_token_middleware(request: Request, call_next):
         "/admin",                     # Admin entry point (will be authenticated by its route handler)
         "/api/token/",                # Token management APIs (already have auth in routes)
         "/api/interactions/",         # Interaction statistics APIs (already have auth in routes)
+        "/api/cache/",                # Answer cache statistics (already has auth in routes)
+        "/api/metrics",               # Metrics (already has auth in routes)
        # "/docs",                      # API docs
         "/openapi.json",              # OpenAPI schema
         "/static/",                   # Static files
         "/access-denied.html",        # Access denied page
         "/api/health",
+        "/api/ready",
 
     ]
     
@@ -74,7 +89,10 @@ async def validate_token_middleware(request: Request, call_next):
     if not token:
         token = request.cookies.get("auth_token")
     
-    if not token or not validate_token(token):
+    started = time.perf_counter()
+    valid = bool(token) and validate_token(token)
+    stage_seconds.observe(time.perf_counter() - started, stage="token_validation")
+    if not valid:
         if path.startswith("/api/"):
             raise HTTPException(status_code=401, detail="Unauthorized")
         else:
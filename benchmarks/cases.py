@@ -0,0 +1,402 @@
+"""
+Benchmark cases for the ingestion and request hot paths.
+
+Every case takes the scratch directory and the size presets and returns
+results as ``{name: {"seconds": ..., "best": ..., ...}}``, where ``seconds``
+is the median time of one operation. Nothing here reaches the network:
+embeddings and the chat model are deterministic fakes.
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import FakeListChatModel
+
+from langchain_community.vectorstores import Chroma
+
+from src import interaction_tracker, rag_engine, token_store
+from src.config import (CHUNK_SIZE, CHUNK_OVERLAP, EXTRACTION_WORKERS, PDF_PARALLEL_MIN_PAGES,
+                        TABLE_GROUP_CHARS, CSV_BLOCK_ROWS, RETRIEVAL_K, RETRIEVAL_CANDIDATES,
+                        CONTEXT_TOKEN_BUDGET)
+from src.document_processors import DocumentProcessor
+from src.embedding_providers import HashingEmbeddings
+from src.lexical_index import BM25Index
+from src.numpy_vectorstore import NumpyVectorStore
+from src.retrievers import HybridRetriever, ContextPacker, estimate_tokens
+
+from . import corpus
+
+# Same size as OpenAI's text-embedding-ada-002 vectors
+EMBEDDING_SIZE = 1536
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Opens a persisted vector store in a fresh process and answers one query; prints the seconds taken
+_COLD_START_SCRIPT = """
+import sys, time
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import Chroma
+from src.numpy_vectorstore import NumpyVectorStore
+kind, path, size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+embedding = DeterministicFakeEmbedding(size=size)
+started = time.perf_counter()
+store = NumpyVectorStore(embedding, path) if kind == "numpy" else Chroma(embedding_function=embedding, persist_directory=path)
+store.similarity_search("cold start query", k=20)
+print(time.perf_counter() - started)
+"""
+
+
+def measure(fn: Callable[[], Any], number: int = 1, repeat: int = 5) -> Dict[str, float]:
+    """Median and best seconds per call over ``repeat`` runs of ``number`` calls."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return {"seconds": statistics.median(times), "best": min(times)}
+
+
+def result_name(name: str, **params) -> str:
+    """Stable result key, e.g. ``validate_token[tokens=10000]``."""
+    if not params:
+        return name
+    return f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def isolate_stores(workdir: str):
+    """Point the token store and the interaction log at the scratch directory."""
+    token_store.TOKEN_DB_PATH = os.path.join(workdir, "tokens.sqlite3")
+    token_store.LEGACY_TOKEN_DB_PATH = os.path.join(workdir, "tokens.json")
+    interaction_tracker.INTERACTIONS_LOG_DIR = os.path.join(workdir, "interactions")
+    interaction_tracker.INTERACTIONS_DB_PATH = os.path.join(workdir, "interactions.json")
+    interaction_tracker.ROLLUPS_PATH = os.path.join(workdir, "interactions", "rollups.json")
+
+
+def bench_process_file(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """DocumentProcessor.process_file for each supported file type."""
+    directory = os.path.join(workdir, "files")
+    os.makedirs(directory, exist_ok=True)
+    rows = sizes["table_rows"]
+    files = {
+        ".txt": os.path.join(directory, "document.txt"),
+        ".pdf": os.path.join(directory, "document.pdf"),
+        ".docx": os.path.join(directory, "document.docx"),
+        ".csv": os.path.join(directory, "table.csv"),
+        ".xlsx": os.path.join(directory, "table.xlsx"),
+    }
+    with open(files[".txt"], "w", encoding="utf-8") as f:
+        f.write(corpus.text(sizes["text_chars"]))
+    corpus.write_pdf(files[".pdf"], sizes["pdf_pages"])
+    corpus.write_docx(files[".docx"], sizes["docx_paragraphs"])
+    corpus.table(rows).to_csv(files[".csv"], index=False)
+    corpus.table(rows).to_excel(files[".xlsx"], index=False)
+
+    processor = DocumentProcessor(pdf_page_workers=EXTRACTION_WORKERS, pdf_parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+                                  table_group_chars=TABLE_GROUP_CHARS, csv_block_rows=CSV_BLOCK_ROWS)
+    results = {}
+    for file_type, path in files.items():
+        timing = measure(lambda: processor.process_file(path), repeat=sizes["repeat"])
+        timing["bytes"] = os.path.getsize(path)
+        results[result_name("process_file", type=file_type)] = timing
+    return results
+
+
+def bench_split(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Splitting an extracted document into chunks, as the index sync does."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    content = corpus.text(sizes["split_chars"])
+    doc = {"filename": "document.txt", "type": ".txt", "content": content}
+    chunks, _ = rag_engine._split_document(doc, splitter)
+    timing = measure(lambda: rag_engine._split_document(doc, splitter), repeat=sizes["repeat"])
+    timing["chunks"] = len(chunks)
+    timing["mb_per_second"] = len(content) / 1e6 / timing["seconds"]
+    return {result_name("split_document", chars=len(content)): timing}
+
+
+def _fake_chat_model(**kwargs):
+    return FakeListChatModel(responses=["Benchmark answer."])
+
+
+def bench_initialize(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    initialize_qa_system on a fresh index (everything embedded) and on a
+    restart with nothing changed, for growing corpora.
+    """
+    results = {}
+    for files in sizes["corpus_files"]:
+        root = os.path.join(workdir, f"corpus_{files}")
+        corpus.write_corpus(os.path.join(root, "data"), files)
+        db_path = os.path.join(root, "chroma_db")
+        with mock.patch.multiple(
+            rag_engine,
+            DOCUMENT_PATH=os.path.join(root, "data") + os.sep,
+            DB_PATH=db_path,
+            INDEX_MANIFEST_PATH=os.path.join(db_path, "index_manifest.json"),
+            EMBEDDING_CACHE_PATH=os.path.join(db_path, "embedding_cache.sqlite3"),
+            INDEX_READ_ONLY=False,
+            build_embeddings=lambda: DeterministicFakeEmbedding(size=EMBEDDING_SIZE),
+            ChatOpenAI=_fake_chat_model
+        ):
+            started = time.perf_counter()
+            rag_engine.initialize_qa_system()
+            cold = time.perf_counter() - started
+            chunks = rag_engine.index_status["chunks"]
+            results[result_name("initialize_qa_system", files=files)] = {
+                "seconds": cold, "best": cold, "chunks": chunks
+            }
+            results[result_name("initialize_qa_system.unchanged", files=files)] = {
+                **measure(rag_engine.initialize_qa_system, repeat=sizes["repeat_slow"]), "chunks": chunks
+            }
+    return results
+
+
+def _open_store(kind: str, path: str, embedding):
+    if kind == "numpy":
+        return NumpyVectorStore(embedding, path)
+    return Chroma(embedding_function=embedding, persist_directory=path)
+
+
+def _cold_start(kind: str, path: str) -> float:
+    output = subprocess.run([sys.executable, "-c", _COLD_START_SCRIPT, kind, path, str(EMBEDDING_SIZE)],
+                            cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+                            env={**os.environ, "ANONYMIZED_TELEMETRY": "False"}).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def bench_vector_store(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Chroma against the memory-mapped NumPy store: adding chunks, opening in a new process, searching."""
+    embedding = DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+    query = embedding.embed_query("benchmark query")
+    results = {}
+    for chunks in sizes["vector_chunks"]:
+        texts = [sentence for i in range(0, chunks, 100) for sentence in corpus.sentences(min(100, chunks - i), seed=i)]
+        metadatas = [{"source": f"document_{i // 50}.txt", "start_index": i % 50 * 150} for i in range(chunks)]
+        for kind in ("chroma", "numpy"):
+            path = os.path.join(workdir, f"vectors_{kind}_{chunks}")
+            store = _open_store(kind, path, embedding)
+            started = time.perf_counter()
+            for start in range(0, chunks, 500):
+                store.add_texts(texts[start:start + 500], metadatas[start:start + 500],
+                                ids=[f"chunk-{i}" for i in range(start, min(start + 500, chunks))])
+            added = time.perf_counter() - started
+            results[result_name("vector_store.add", store=kind, chunks=chunks)] = {"seconds": added, "best": added}
+            results[result_name("vector_store.search", store=kind, chunks=chunks)] = measure(
+                lambda: store.similarity_search_by_vector(query, k=20), number=20, repeat=sizes["repeat"]
+            )
+            cold = [_cold_start(kind, path) for _ in range(sizes["repeat_slow"])]
+            results[result_name("vector_store.cold_start", store=kind, chunks=chunks)] = {
+                "seconds": statistics.median(cold), "best": min(cold)
+            }
+    return results
+
+
+class _VectorTable(Embeddings):
+    """Precomputed embeddings looked up by text."""
+
+    def __init__(self, vectors: Dict[str, np.ndarray]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.vectors[text]
+
+
+def _clustered_vectors(count: int, queries: int, seed: int = 0):
+    """
+    Unit vectors grouped around topics (about 20 chunks each), and query
+    vectors near random chunks: like text embeddings, a query's top results
+    are close in score, which is where quantization errors change rankings.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(1, count // 20), EMBEDDING_SIZE)).astype(np.float32)
+    vectors = topics[rng.integers(len(topics), size=count)] + rng.standard_normal((count, EMBEDDING_SIZE), dtype=np.float32)
+    near = vectors[rng.integers(count, size=queries)] + rng.standard_normal((queries, EMBEDDING_SIZE), dtype=np.float32)
+    return [v / np.linalg.norm(v, axis=1, keepdims=True) for v in (vectors, near)]
+
+
+def bench_quantization(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """NumPy store precisions: search time, recall@10 against exact search, and vector bytes in MB."""
+    k = 10
+    results = {}
+    for chunks in sizes["vector_chunks"]:
+        vectors, queries = _clustered_vectors(chunks, sizes["recall_queries"])
+        texts = [f"chunk {i}" for i in range(chunks)]
+        embedding = _VectorTable({**dict(zip(texts, vectors)), **{f"query {i}": q for i, q in enumerate(queries)}})
+        exact = [set(np.argsort(-(vectors @ query))[:k]) for query in queries]
+        for precision, rescore_factor in (("float32", 0), ("float16", 0), ("float16", 4), ("int8", 0), ("int8", 4)):
+            path = os.path.join(workdir, f"quantized_{precision}_{rescore_factor}_{chunks}")
+            store = NumpyVectorStore(embedding, path, precision=precision, rescore_factor=rescore_factor)
+            for start in range(0, chunks, 1000):
+                store.add_texts(texts[start:start + 1000], ids=[str(i) for i in range(start, min(start + 1000, chunks))])
+            found = [{int(doc.id) for doc in store.similarity_search(f"query {i}", k=k)} for i in range(len(queries))]
+            result = measure(lambda: store.similarity_search("query 0", k=k), number=20, repeat=sizes["repeat"])
+            result["recall_at_10"] = float(np.mean([len(a & b) / k for a, b in zip(found, exact)]))
+            result.update({f"{kind}_mb": size / 2 ** 20 for kind, size in store.nbytes().items()})
+            results[result_name("quantization.search", precision=precision, rescore=rescore_factor, chunks=chunks)] = result
+    return results
+
+
+def _data_folder_chunks():
+    """Chunks of the documents shipped in data/, split as the index sync splits them."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True)
+    processor = DocumentProcessor()
+    data_dir = os.path.join(PROJECT_DIR, "data")
+    texts, metadatas = [], []
+    for name in sorted(os.listdir(data_dir)):
+        doc = processor.process_file(os.path.join(data_dir, name))
+        if doc:
+            chunks, chunk_metadatas = rag_engine._split_document(doc, splitter)
+            texts += chunks
+            metadatas += chunk_metadatas
+    return texts, metadatas
+
+
+def bench_context(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Prompt tokens of retrieved context per question over the data/ documents:
+    the RETRIEVAL_K best chunks as they are, against the context packed as the
+    QA chain packs it. With CONTEXT_TOKEN_BUDGET=0 both hold the same text, so
+    the difference is the overlap and duplicates removed.
+    """
+    texts, metadatas = _data_folder_chunks()
+    store = NumpyVectorStore(HashingEmbeddings(), os.path.join(workdir, "context_index"))
+    store.add_texts(texts, metadatas)
+    lexical_index = BM25Index.from_vectorstore(store)
+    # Questions made of the opening words of chunks, so their neighbours (which overlap them) rank high too
+    questions = [" ".join(text.split()[:8]) + "?" for text in texts[::5]][:sizes["recall_queries"]]
+
+    def retriever(k: int) -> HybridRetriever:
+        return HybridRetriever(vectorstore=store, lexical_index=lexical_index, k=k, candidates=RETRIEVAL_CANDIDATES)
+
+    retrievers = {
+        result_name("context", k=RETRIEVAL_K): retriever(RETRIEVAL_K),
+        result_name("context", k=RETRIEVAL_K, packed=CONTEXT_TOKEN_BUDGET or "no_budget"): ContextPacker(
+            retriever=retriever(RETRIEVAL_CANDIDATES if CONTEXT_TOKEN_BUDGET > 0 else RETRIEVAL_K),
+            token_budget=CONTEXT_TOKEN_BUDGET),
+    }
+    results = {}
+    for name, context_retriever in retrievers.items():
+        contexts = [context_retriever.invoke(question) for question in questions]
+        timing = measure(lambda: context_retriever.invoke(questions[0]), number=10, repeat=sizes["repeat"])
+        # The "stuff" chain joins the passages with blank lines
+        timing["prompt_tokens"] = float(np.mean([
+            estimate_tokens("\n\n".join(doc.page_content for doc in docs)) for docs in contexts
+        ]))
+        timing["passages"] = float(np.mean([len(docs) for docs in contexts]))
+        results[name] = timing
+    fixed, packed = results.values()
+    packed["tokens_saved_percent"] = 100 * (1 - packed["prompt_tokens"] / fixed["prompt_tokens"])
+    return results
+
+
+def bench_token_store(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """validate_token as the token store grows."""
+    conn = token_store._get_connection()
+    results = {}
+    stored = 0
+    for count in sizes["tokens"]:
+        rows = [(str(uuid.uuid4()), f"Customer {i}", f"customer{i}@example.com", str(datetime.now()), "active")
+                for i in range(stored, count)]
+        with conn:
+            conn.executemany("INSERT INTO tokens VALUES (?, ?, ?, ?, ?)", rows)
+        stored = count
+        probes = [row[0] for row in conn.execute("SELECT token FROM tokens ORDER BY random() LIMIT 1000")]
+        lookups = iter(probes * 1000)
+        results[result_name("validate_token", tokens=count)] = measure(
+            lambda: token_store.validate_token(next(lookups)), number=1000, repeat=sizes["repeat"]
+        )
+    return results
+
+
+def _grow_history(tokens: List[str], count: int):
+    for i in range(count):
+        interaction_tracker.record_interaction(tokens[i % len(tokens)], f"Question {i} about article {i % 97}?",
+                                               "Benchmark answer.")
+    interaction_tracker.flush_interactions()
+
+
+def bench_interactions(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """record_interaction and get_interaction_stats as the interaction history grows."""
+    tokens = [str(uuid.uuid4()) for _ in range(100)]
+    results = {}
+    recorded = 0
+    for count in sizes["history"]:
+        _grow_history(tokens, count - recorded)
+        recorded = count
+        # Measured after a flush so every size starts from an empty buffer
+        i = iter(range(10 ** 9))
+        results[result_name("record_interaction", history=count)] = measure(
+            lambda: interaction_tracker.record_interaction(tokens[next(i) % len(tokens)], "Question?", "Answer."),
+            number=1000, repeat=sizes["repeat"]
+        )
+        interaction_tracker.flush_interactions()
+        recorded += 1000 * sizes["repeat"]
+        results[result_name("get_interaction_stats", history=count)] = measure(
+            interaction_tracker.get_interaction_stats, number=10, repeat=sizes["repeat"]
+        )
+    return results
+
+
+async def _request_loop(app, path: str, cookies: Dict[str, str], number: int, repeat: int) -> Dict[str, float]:
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", cookies=cookies) as client:
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                response = await client.get(path)
+                response.raise_for_status()
+            times.append((time.perf_counter() - started) / number)
+    return {"seconds": statistics.median(times), "best": min(times)}
+
+
+def bench_middleware(workdir: str, sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Cost of validate_token_middleware per request, against the same app without it."""
+    from fastapi import FastAPI
+    from app import validate_token_middleware
+
+    async def ping():
+        return {"ok": True}
+
+    plain = FastAPI()
+    plain.get("/api/ping")(ping)
+    protected = FastAPI()
+    protected.get("/api/ping")(ping)
+    protected.middleware("http")(validate_token_middleware)
+
+    token = token_store.create_token("Benchmark", "benchmark@example.com")["token"]
+    without = asyncio.run(_request_loop(plain, "/api/ping", {}, 500, sizes["repeat"]))
+    with_token = asyncio.run(_request_loop(protected, "/api/ping", {"auth_token": token}, 500, sizes["repeat"]))
+    with_token["overhead_seconds"] = with_token["seconds"] - without["seconds"]
+    return {
+        result_name("request", middleware="none"): without,
+        result_name("request", middleware="validate_token"): with_token,
+    }
+
+
+# Run in this order; names are what --only matches against
+CASES = {
+    "process_file": bench_process_file,
+    "split": bench_split,
+    "initialize": bench_initialize,
+    "vector_store": bench_vector_store,
+    "quantization": bench_quantization,
+    "context": bench_context,
+    "token_store": bench_token_store,
+    "interactions": bench_interactions,
+    "middleware": bench_middleware,
+}
@@ -0,0 +1,112 @@
+"""
+Deterministic synthetic documents for the benchmarks.
+
+Every file type the document processor reads can be generated with a given
+size, so results do not depend on what happens to be in the data folder.
+"""
+import os
+import random
+from typing import List
+
+import pandas as pd
+
+_WORDS = (
+    "insurance authority license policy premium claim article clause regulation "
+    "broker coverage liability underwriting reinsurance compliance board federal "
+    "law decision company branch capital solvency audit report annual market "
+    "customer complaint fee penalty period renewal contract vehicle health life"
+).split()
+
+
+def sentences(count: int, seed: int = 0) -> List[str]:
+    """Sentences of legal-sounding filler with article numbers sprinkled in."""
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+        if i % 5 == 0:
+            words.insert(rng.randint(0, len(words)), f"article {rng.randint(1, 120)}.{rng.randint(1, 9)}")
+        result.append(" ".join(words).capitalize() + ".")
+    return result
+
+
+def text(chars: int, seed: int = 0) -> str:
+    """Paragraphs of filler text of about ``chars`` characters."""
+    paragraphs = []
+    size = 0
+    paragraph_seed = seed * 1000
+    while size < chars:
+        paragraph = " ".join(sentences(6, paragraph_seed))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+        paragraph_seed += 1
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def _pdf_string(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, seed: int = 0):
+    """A plain PDF with one Helvetica text block per page, extractable by PyPDF2."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        lines = sentences(40, seed * 10000 + page)
+        body = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({_pdf_string(line[:110])}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % ref for ref in page_refs), pages)
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def table(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A table shaped like a register of licensed companies."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "license_no": [f"IA-{seed:02d}-{i:06d}" for i in range(rows)],
+        "company": [f"{rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS).capitalize()} LLC" for _ in range(rows)],
+        "class": [rng.choice(("life", "health", "motor", "property", "marine")) for _ in range(rows)],
+        "capital_aed": [rng.randint(1, 500) * 100000 for _ in range(rows)],
+        "notes": [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) for _ in range(rows)],
+    })
+
+
+def write_docx(path: str, paragraphs: int, seed: int = 0):
+    from docx import Document
+    document = Document()
+    for i in range(paragraphs):
+        document.add_paragraph(" ".join(sentences(4, seed * 10000 + i)))
+    document.save(path)
+
+
+def write_corpus(directory: str, files: int, chars_per_file: int = 5000) -> List[str]:
+    """A data folder of ``files`` text documents of ``chars_per_file`` characters each."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"document_{i:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text(chars_per_file, seed=i))
+        paths.append(path)
+    return paths
@@ -0,0 +1,193 @@
+"""
+Offline benchmark suite for the ingestion and request hot paths.
+
+Runs every case against a scratch directory with fake embeddings and a fake
+chat model, writes the timings to a JSON file and compares them with a
+stored baseline. Run from the project root:
+
+    python -m benchmarks.run                  # full sizes, compare with benchmarks/baseline.json
+    python -m benchmarks.run --quick          # smaller sizes, for a fast check
+    python -m benchmarks.run --only initialize token_store
+    python -m benchmarks.run --save-baseline  # record these results as the new baseline
+
+Exits with status 1 when a result is more than --tolerance slower than the baseline.
+Baselines are only comparable on the same machine and with the same preset
+(a --quick run is not compared with a full baseline).
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Before anything from src is imported: no real credentials or telemetry needed
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+SIZES = {
+    "full": {
+        "repeat": 5,
+        "repeat_slow": 3,
+        "text_chars": 200_000,
+        "pdf_pages": 40,
+        "docx_paragraphs": 500,
+        "table_rows": 5000,
+        "split_chars": 1_000_000,
+        "corpus_files": [10, 50, 200],
+        "vector_chunks": [2_000, 20_000],
+        "recall_queries": 200,
+        "tokens": [1_000, 10_000, 100_000],
+        "history": [1_000, 10_000, 100_000],
+    },
+    "quick": {
+        "repeat": 3,
+        "repeat_slow": 1,
+        "text_chars": 50_000,
+        "pdf_pages": 10,
+        "docx_paragraphs": 100,
+        "table_rows": 1000,
+        "split_chars": 200_000,
+        "corpus_files": [5, 20],
+        "vector_chunks": [2_000],
+        "recall_queries": 50,
+        "tokens": [1_000, 10_000],
+        "history": [1_000, 10_000],
+    },
+}
+
+# Differences below this many seconds are noise, whatever the ratio
+_NOISE_FLOOR = 1e-6
+
+# Recall may drop this much below the baseline (results are seeded, so any real drop is a change)
+_RECALL_TOLERANCE = 0.005
+
+
+def run_cases(names: List[str], sizes: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    from . import cases
+    from src.interaction_tracker import flush_interactions
+
+    # Keep the benchmark output readable; the engine logs every step at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("chromadb.telemetry").setLevel(logging.CRITICAL)
+
+    workdir = tempfile.mkdtemp(prefix="rag-benchmark-")
+    # Registered first so it runs after the interaction tracker's own exit flush
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    cases.isolate_stores(workdir)
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        print(f"Running {name}...", flush=True)
+        results.update(cases.CASES[name](workdir, sizes))
+        print(f"  done in {time.perf_counter() - started:.1f}s", flush=True)
+    flush_interactions()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Print each result next to its baseline; return the names that got slower or lost recall."""
+    regressions = []
+    width = max(len(name) for name in results)
+    print(f"\n{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for name, result in results.items():
+        current = result["seconds"]
+        before = baseline.get(name, {}).get("seconds")
+        if before is None:
+            print(f"{name:<{width}}  {'-':>12}  {_format_seconds(current):>12}  {'new':>8}")
+            continue
+        change = (current - before) / before if before else 0.0
+        regressed = change > tolerance and current - before > _NOISE_FLOOR
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<{width}}  {_format_seconds(before):>12}  {_format_seconds(current):>12}  "
+              f"{change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    for name, result in results.items():
+        before = baseline.get(name, {}).get("recall_at_10")
+        if before is not None and result["recall_at_10"] < before - _RECALL_TOLERANCE:
+            regressions.append(name)
+            print(f"{name}: recall@10 {result['recall_at_10']:.3f}, baseline {before:.3f}  REGRESSION")
+    return regressions
+
+
+def print_measurements(results: Dict[str, Dict[str, float]]):
+    """Print what cases measured besides time, e.g. recall and memory."""
+    measured = {name: {key: value for key, value in result.items() if key not in ("seconds", "best")}
+                for name, result in results.items()}
+    measured = {name: values for name, values in measured.items() if values}
+    if not measured:
+        return
+    width = max(len(name) for name in measured)
+    print()
+    for name, values in measured.items():
+        print(f"{name:<{width}}  " + "  ".join(f"{key} {value:.4g}" for key, value in values.items()))
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def main():
+    from . import cases
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--only", nargs="+", choices=list(cases.CASES), help="run only these cases")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="slowdown relative to the baseline reported as a regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    args = parser.parse_args()
+
+    preset = "quick" if args.quick else "full"
+    results = run_cases(args.only or list(cases.CASES), SIZES[preset])
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "preset": preset,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        # Presets share result names but not input sizes, so only the same preset compares
+        if baseline.get("preset") == preset:
+            regressions = compare(results, baseline["results"], args.tolerance)
+        else:
+            print(f"\nNot comparing: {args.baseline} was recorded with the "
+                  f"{baseline.get('preset', 'unknown')} preset, this run used {preset}")
+    print_measurements(results)
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline "
+              f"or with lower recall")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
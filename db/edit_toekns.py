@@ -1,28 +1,36 @@
-import json
 import os
+import sqlite3
+import sys
 
-# Path to the tokens.json file
-tokens_file = "./tokens.json"
+# Run from anywhere: the token store paths are relative to the project root
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_DIR)
+sys.path.insert(0, PROJECT_DIR)
 
-# Create a backup first
-if os.path.exists(tokens_file):
-    with open(tokens_file, "r") as f:
-        os.system(f"cp {tokens_file} {tokens_file}.backup")
-    
-    # Read the current tokens
-    with open(tokens_file, "r") as f:
-        tokens = json.load(f)
-    
-    # Select only the first 3 active tokens (or fewer if there aren't 3)
-    active_tokens = [t for t in tokens if t["status"] == "active"]
-    if len(active_tokens) > 3:
-        active_tokens = active_tokens[:3]
-    
-    # Write the reduced list back to the file
-    with open(tokens_file, "w") as f:
-        json.dump(active_tokens, f, indent=2)
-    
-    print(f"Tokens reduced to {len(active_tokens)} entries.")
-    print(f"Backup saved to {tokens_file}.backup")
-else:
-    print(f"Error: {tokens_file} not found.")
+from src import token_store
+
+# Tokens left active; the others are revoked
+KEEP_ACTIVE = 3
+
+tokens_db = token_store.TOKEN_DB_PATH
+backup_file = f"{tokens_db}.backup"
+
+# Create a backup first (SQLite's backup API copies a consistent snapshot)
+source = sqlite3.connect(tokens_db) if os.path.exists(tokens_db) else None
+if source is None and not os.path.exists(token_store.LEGACY_TOKEN_DB_PATH):
+    print(f"Error: {tokens_db} not found.")
+    sys.exit(1)
+if source is not None:
+    with sqlite3.connect(backup_file) as backup:
+        source.backup(backup)
+    source.close()
+
+# Select only the first 3 active tokens (or fewer if there aren't 3)
+active_tokens = [t for t in token_store.get_all_tokens() if t["status"] == "active"]
+for token in active_tokens[KEEP_ACTIVE:]:
+    token_store.revoke_token(token["token"])
+
+print(f"Active tokens reduced to {min(len(active_tokens), KEEP_ACTIVE)} entries "
+      f"({max(len(active_tokens) - KEEP_ACTIVE, 0)} revoked).")
+if source is not None:
+    print(f"Backup saved to {backup_file}")
@@ -2,18 +2,18 @@
 Main entry point for the RAG Server application.
 """
 import os
+import logging
 import uvicorn
 from dotenv import load_dotenv
-from src.rag_engine import initialize_qa_system
+from src.rag_engine import build_index
+from src.config import WORKERS, STARTUP_MODE, WATCH_DATA_DIR
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
 if __name__ == "__main__":
-    # Initialize the QA system before starting server
-    print("Initializing QA system...")
-    initialize_qa_system()
-
     PORT = int(os.getenv("PORT", 8000))
     HOST = os.getenv("HOST", "0.0.0.0")
     BASE_URL = os.getenv("BASE_URL", "https://chatbot.finitx.com")
@@ -22,5 +22,19 @@ if __name__ == "__main__":
     print(f"Access the API documentation at {BASE_URL}/docs")
     print(f"Access the admin panel at {BASE_URL}/admin")
     
-    # Run the server
-    uvicorn.run("app:app", host=HOST, port=PORT, reload=True)
\ No newline at end of file
+    if WORKERS > 1:
+        # Build the index once here; the workers only read it
+        print("Building the document index...")
+        build_index()
+        if WATCH_DATA_DIR:
+            logger.warning(f"The data folder is not watched with {WORKERS} workers; "
+                           "restart the server to index document changes")
+        os.environ["INDEX_READ_ONLY"] = "true"
+        print(f"Starting {WORKERS} workers")
+        uvicorn.run("app:app", host=HOST, port=PORT, workers=WORKERS)
+    else:
+        # The app initializes the QA system itself on startup
+        if STARTUP_MODE == "background":
+            print("The document index is built in the background; questions get 503 until it is ready")
+            print(f"Check progress at {BASE_URL}/api/ready")
+        uvicorn.run("app:app", host=HOST, port=PORT, reload=True)
\ No newline at end of file
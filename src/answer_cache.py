@@ -0,0 +1,146 @@
+"""
+In-memory cache of answers in front of the RAG chain.
+
+Questions are matched on their normalized text first and, when a similarity
+threshold is configured, on the cosine similarity of their embeddings.
+"""
+import re
+import threading
+import time
+import unicodedata
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CachedAnswer = Tuple[str, List[str]]
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache key."""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    # Ignore trailing punctuation, including the Arabic question mark
+    return text.rstrip(" ?!.؟")
+
+
+class AnswerCache:
+    """LRU cache of (answer, sources) with a time-to-live and optional semantic hits."""
+
+    def __init__(self, max_entries: int, ttl: float, similarity_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        # key -> (created_at, answer, sources, normalized embedding or None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked embeddings for semantic lookups, rebuilt lazily after changes
+        self._matrix = None
+        self._matrix_keys = []
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, question: str,
+               embed: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[CachedAnswer], Optional[np.ndarray]]:
+        """
+        Find a cached answer for a question.
+
+        ``embed`` is only called on an exact-match miss when semantic lookups
+        are enabled. Returns the cached ``(answer, sources)`` or ``None``, and
+        the question embedding if one was computed so ``put`` can reuse it.
+        """
+        if not self.enabled:
+            return None, None
+        key = normalize_question(question)
+
+        with self._lock:
+            entry = self._get_fresh(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["exact_hits"] += 1
+                return (entry[1], entry[2]), None
+
+        vector = None
+        if self.similarity_threshold > 0 and embed is not None:
+            try:
+                vector = self._normalize(embed(question))
+            except Exception as e:
+                logger.warning(f"Could not embed question for the answer cache: {e}")
+
+        with self._lock:
+            if vector is not None:
+                similar_key = self._most_similar(vector)
+                if similar_key is not None:
+                    entry = self._entries[similar_key]
+                    self._entries.move_to_end(similar_key)
+                    self._counters["semantic_hits"] += 1
+                    return (entry[1], entry[2]), vector
+            self._counters["misses"] += 1
+        return None, vector
+
+    def put(self, question: str, answer: str, sources: List[str], vector: Optional[np.ndarray] = None):
+        """Store an answer, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer, sources, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        """Drop every cached answer, e.g. after the index changed."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._counters["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _get_fresh(self, key: str):
+        """Return the entry for key, dropping it if it has expired. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            self._matrix = None
+            return None
+        return entry
+
+    def _most_similar(self, vector: np.ndarray) -> Optional[str]:
+        """Key of the fresh entry most similar to vector above the threshold. Caller holds the lock."""
+        if self._matrix is None:
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry[3] is not None]
+            self._matrix = (np.vstack([self._entries[key][3] for key in self._matrix_keys])
+                            if self._matrix_keys else np.empty((0, len(vector)), dtype=np.float32))
+        if not self._matrix_keys:
+            return None
+
+        scores = self._matrix @ vector
+        for index in np.argsort(-scores):
+            if scores[index] < self.similarity_threshold:
+                break
+            key = self._matrix_keys[index]
+            if self._get_fresh(key) is not None:
+                return key
+        return None
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
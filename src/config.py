@@ -14,16 +14,106 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
 TEMPERATURE = float(os.getenv("TEMPERATURE", 0.7))
 
+# Maximum number of questions sent to the LLM at the same time
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+
 # Document Settings
 DOCUMENT_PATH = os.getenv("DOCUMENT_PATH", "data/")
 
+# Document extraction: worker processes (1 = extract in the server process) and per-file timeout in seconds
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", min(4, os.cpu_count() or 1)))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 300))
+
+# PDFs with at least this many pages are extracted with EXTRACTION_WORKERS processes in parallel
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 50))
+
+# CSV files are read this many rows at a time; files of at least CSV_STREAM_MIN_BYTES
+# are streamed block by block into the index instead of being loaded whole
+CSV_BLOCK_ROWS = int(os.getenv("CSV_BLOCK_ROWS", 5000))
+CSV_STREAM_MIN_BYTES = int(os.getenv("CSV_STREAM_MIN_BYTES", 10 * 1024 * 1024))
+
+# "blocking": only start serving once every document is extracted and embedded; "background":
+# serve the index persisted in DB_PATH right away and bring it up to date in the background
+# (/api/ask returns 503 until an index can be served, see /api/ready)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "blocking").lower()
+
+# Uvicorn worker processes started by main.py. With more than one, main.py builds the
+# index once and the workers open it read-only (INDEX_READ_ONLY is set for them): the
+# data folder is not watched, and document changes are indexed on the next restart
+WORKERS = int(os.getenv("WORKERS", 1))
+INDEX_READ_ONLY = os.getenv("INDEX_READ_ONLY", "false").lower() == "true"
+
+# Watch the data folder and apply document changes to the live index (set to "false" to disable;
+# only with WORKERS=1);
+# seconds to wait for a burst of changes to settle, and the polling interval when watchfiles is not installed
+WATCH_DATA_DIR = os.getenv("WATCH_DATA_DIR", "true").lower() == "true"
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", 1.0))
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", 2.0))
+
+# Embeddings: "openai" (the embeddings endpoint at OPENAI_BASE_URL) or "hashing" (computed in-process
+# from hashed words and character n-grams, no network; matches terms rather than meaning), and the
+# vector size of the hashing backend. Changing either rebuilds the index
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+HASHING_EMBEDDING_DIMENSIONS = int(os.getenv("HASHING_EMBEDDING_DIMENSIONS", 1024))
+
 # Database Settings
 DB_PATH = os.getenv("DB_PATH", "db/chroma_db")
 
+# Vector store: "chroma", or "numpy" to keep the embeddings in one memory-mapped float32 matrix
+# under DB_PATH, searched exactly with a matrix product (fast to open and query for small corpora).
+# Changing it rebuilds the index
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma").lower()
+
+# Precision of the numpy store's vectors: "float32", "float16" (half the memory) or "int8" (a quarter,
+# with one scale per vector). Quantized rows are converted to float32 for every search, which costs
+# latency: with NumPy 1.26 and 1536 dimensions, int8 searches take ~1.8x as long as float32 and
+# float16 ~8.5x (e.g. 1.2 ms and 5.6 ms against 0.66 ms for 2000 chunks). Changing it rebuilds the index
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()
+# With float16/int8, rank the VECTOR_RESCORE_FACTOR * k best chunks again by their exact score, read from
+# a float32 copy kept on disk (0: rank by the quantized score and keep no copy)
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+
+# On-disk cache of chunk embeddings keyed by (model, text); max vectors kept (0 disables)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(DB_PATH, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000))
+
+# Embedding requests during ingestion: chunks per request, requests in flight,
+# and retries with exponential backoff (base delay in seconds) on 429/5xx/connection errors
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+EMBEDDING_MAX_PARALLEL = int(os.getenv("EMBEDDING_MAX_PARALLEL", 4))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 6))
+EMBEDDING_RETRY_BASE_DELAY = float(os.getenv("EMBEDDING_RETRY_BASE_DELAY", 1.0))
+
+# Manifest of indexed files, used to only re-embed new or changed documents on startup
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", os.path.join(DB_PATH, "index_manifest.json"))
+
+# Retrieval: "vector" (embeddings), "hybrid" (embeddings and BM25 fused by reciprocal rank)
+# or "lexical" (BM25 only, no embedding call); chunks passed to the LLM, and candidates
+# taken from each side before fusion
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 3))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", 20))
+
+# Retrieved chunks are de-duplicated and overlapping neighbours merged before they reach the LLM.
+# 0 packs the RETRIEVAL_K best chunks: the same text as sending them as they are, minus the overlap.
+# Above 0, passages are instead added by relevance up to about this many tokens (~4 characters
+# each), considering RETRIEVAL_CANDIDATES chunks; keep it above the largest chunks (a row group
+# of TABLE_GROUP_CHARS is ~250 tokens) or spreadsheet questions get a single passage
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 0))
+
+# Answer cache: max entries (0 disables), time-to-live in seconds, and the cosine
+# similarity above which a differently worded question reuses an answer (0 disables)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 256))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 3600))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0))
+
 # Text Splitter Settings
 CHUNK_SIZE = 200
 CHUNK_OVERLAP = 50
 
+# Spreadsheet rows are embedded in groups of up to this many characters, each repeating the column headers
+TABLE_GROUP_CHARS = int(os.getenv("TABLE_GROUP_CHARS", 1000))
+
 # OpenAI Base URL - Add this new configuration
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")  # Default to standard OpenAI endpoint
 
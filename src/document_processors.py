@@ -1,16 +1,102 @@
 import os
 import PyPDF2
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import unicodedata
 import logging
+import multiprocessing
+import queue
+import time
 
 logger = logging.getLogger(__name__)
 
+# Processor instance reused by each extraction worker process
+_worker_processor = None
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract the text of pages [start, stop) of a PDF as (page number, text) pairs."""
+    pages = []
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page_num in range(start, min(stop, len(reader.pages))):
+            try:
+                page_text = reader.pages[page_num].extract_text()
+                if page_text:
+                    pages.append((page_num + 1, page_text))
+                    logger.debug(f"Extracted text from page {page_num + 1}: {len(page_text)} characters")
+                else:
+                    logger.warning(f"No text found on page {page_num + 1}")
+            except Exception as e:
+                logger.error(f"Error extracting text from page {page_num + 1}: {e}")
+    return pages
+
+
+def _table_segments(title: str, df: pd.DataFrame, metadata: Dict[str, Any],
+                    max_chars: int, first_row: int = 1) -> List[Dict[str, Any]]:
+    """
+    Render a table as groups of whole rows of at most ``max_chars`` characters.
+
+    Every group starts with ``title`` and the column headers so it can be
+    embedded on its own; groups are marked so the text splitter keeps them whole.
+    """
+    prefix = f"{title}\n{' | '.join(str(column) for column in df.columns)}\n"
+    lines = [" | ".join(map(str, row)) for row in df.fillna("").itertuples(index=False, name=None)]
+    
+    segments = []
+    start = 0
+    size = len(prefix)
+    for i, line in enumerate(lines):
+        if i > start and size + len(line) > max_chars:
+            segments.append({
+                'content': prefix + "\n".join(lines[start:i]),
+                'metadata': {**metadata, 'row_start': first_row + start, 'row_end': first_row + i - 1},
+                'split': False
+            })
+            start = i
+            size = len(prefix)
+        size += len(line) + 1
+    if start < len(lines):
+        segments.append({
+            'content': prefix + "\n".join(lines[start:]),
+            'metadata': {**metadata, 'row_start': first_row + start, 'row_end': first_row + len(lines) - 1},
+            'split': False
+        })
+    return segments
+
+
+def _init_worker(table_group_chars: int, csv_block_rows: int):
+    """Set up the processor of an extraction worker process."""
+    global _worker_processor
+    # Workers are daemonic and can't start page workers of their own
+    _worker_processor = DocumentProcessor(table_group_chars=table_group_chars,
+                                          csv_block_rows=csv_block_rows)
+
+
+def _extract_in_worker(file_path: str) -> Optional[Dict[str, str]]:
+    """Entry point for extraction worker processes."""
+    return _worker_processor.process_file(file_path)
+
+
 class DocumentProcessor:
     """Process different file types into text for RAG embedding"""
     
-    def __init__(self):
+    def __init__(self, pdf_page_workers: int = 1, pdf_parallel_min_pages: int = 50,
+                 table_group_chars: int = 1000, csv_block_rows: int = 5000):
+        # PDFs with at least pdf_parallel_min_pages pages are split across
+        # pdf_page_workers processes
+        self.pdf_page_workers = pdf_page_workers
+        self.pdf_parallel_min_pages = pdf_parallel_min_pages
+        self.table_group_chars = table_group_chars
+        self.csv_block_rows = csv_block_rows
+        
+        # Readers returning per-part records ("segments") with their own metadata
+        self.segment_readers = {
+            '.pdf': self.read_pdf_segments,
+            '.csv': self.read_csv_segments,
+            '.xlsx': self.read_excel_segments,
+            '.xls': self.read_excel_segments
+        }
         self.supported_extensions = {
             '.txt': self.read_text,
             '.pdf': self.read_pdf,
@@ -45,78 +131,95 @@ class DocumentProcessor:
                 logger.error(f"Failed to read text file with any encoding: {file_path} - {e}")
                 return ""
     
-    def read_pdf(self, file_path: str) -> str:
-        """Read PDF files using PyPDF2"""
+    def read_pdf_segments(self, file_path: str) -> List[Dict[str, Any]]:
+        """Read PDF files page by page using PyPDF2"""
         logger.info(f"Reading PDF file: {file_path}")
-        text = ""
+        pages = []
         try:
             with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                num_pages = len(reader.pages)
-                logger.info(f"PDF has {num_pages} pages")
-                
-                for page_num, page in enumerate(reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += f"Page {page_num + 1}:\n{page_text}\n\n"
-                            logger.debug(f"Extracted text from page {page_num + 1}: {len(page_text)} characters")
-                        else:
-                            logger.warning(f"No text found on page {page_num + 1}")
-                    except Exception as e:
-                        logger.error(f"Error extracting text from page {page_num + 1}: {e}")
-                
-                if text:
-                    logger.info(f"Successfully read PDF: {file_path} ({len(text)} characters total)")
-                else:
-                    logger.warning(f"No text could be extracted from PDF: {file_path}")
+                num_pages = len(PyPDF2.PdfReader(file).pages)
+            logger.info(f"PDF has {num_pages} pages")
+            
+            if self.pdf_page_workers > 1 and num_pages >= self.pdf_parallel_min_pages:
+                # Split big PDFs into page ranges extracted in parallel
+                workers = min(self.pdf_page_workers, num_pages)
+                step = -(-num_pages // workers)
+                ranges = [(file_path, start, start + step) for start in range(0, num_pages, step)]
+                logger.info(f"Extracting {num_pages} pages with {len(ranges)} worker processes")
+                with multiprocessing.get_context("spawn").Pool(processes=len(ranges)) as pool:
+                    parts = pool.starmap(_extract_pdf_pages, ranges)
+                pages = [page for part in parts for page in part]
+            else:
+                pages = _extract_pdf_pages(file_path, 0, num_pages)
+            
+            if pages:
+                total = sum(len(text) for _, text in pages)
+                logger.info(f"Successfully read PDF: {file_path} ({len(pages)} pages, {total} characters total)")
+            else:
+                logger.warning(f"No text could be extracted from PDF: {file_path}")
         except Exception as e:
             logger.error(f"Error reading PDF {file_path}: {e}")
-        return text
+        return [{'content': text, 'metadata': {'page': page_num}} for page_num, text in pages]
     
-    def read_csv(self, file_path: str) -> str:
-        """Read CSV files and convert to text"""
+    def read_pdf(self, file_path: str) -> str:
+        """Read PDF files using PyPDF2"""
+        return "\n\n".join(segment['content'] for segment in self.read_pdf_segments(file_path))
+    
+    def iter_csv_blocks(self, file_path: str) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Read a CSV file csv_block_rows rows at a time, yielding the row groups
+        of each block, so memory use does not grow with the file size.
+        Read errors are raised to the caller.
+        """
+        title = f"CSV File: {os.path.basename(file_path)}"
+        first_row = 1
+        with pd.read_csv(file_path, chunksize=self.csv_block_rows) as reader:
+            for block in reader:
+                yield _table_segments(title, block, {}, self.table_group_chars, first_row)
+                first_row += len(block)
+    
+    def read_csv_segments(self, file_path: str) -> List[Dict[str, Any]]:
+        """Read CSV files as row groups that repeat the column headers"""
         logger.info(f"Reading CSV file: {file_path}")
+        segments = []
         try:
-            df = pd.read_csv(file_path)
-            rows, cols = df.shape
-            logger.info(f"CSV dimensions: {rows} rows x {cols} columns")
-            
-            # Convert to string with headers
-            content = f"CSV File: {os.path.basename(file_path)}\n\n{df.to_string(index=False)}"
-            logger.info(f"Successfully read CSV: {file_path} ({len(content)} characters)")
-            return content
+            for block in self.iter_csv_blocks(file_path):
+                segments.extend(block)
+            logger.info(f"Successfully read CSV: {file_path} ({len(segments)} row groups)")
         except Exception as e:
             logger.error(f"Error reading CSV {file_path}: {e}")
-            return ""
+            return []
+        return segments
     
-    def read_excel(self, file_path: str) -> str:
-        """Read Excel files and convert to text"""
+    def read_csv(self, file_path: str) -> str:
+        """Read CSV files and convert to text"""
+        return "\n\n".join(segment['content'] for segment in self.read_csv_segments(file_path))
+    
+    def read_excel_segments(self, file_path: str) -> List[Dict[str, Any]]:
+        """Read Excel files as row groups that repeat the column headers"""
         logger.info(f"Reading Excel file: {file_path}")
+        segments = []
         try:
-            # Read all sheets
-            xls = pd.ExcelFile(file_path)
-            logger.info(f"Excel file has {len(xls.sheet_names)} sheets: {', '.join(xls.sheet_names)}")
+            # Parse the workbook once, getting every sheet
+            sheets = pd.read_excel(file_path, sheet_name=None)
+            logger.info(f"Excel file has {len(sheets)} sheets: {', '.join(map(str, sheets))}")
             
-            sheets_text = []
+            for sheet_name, df in sheets.items():
+                rows, cols = df.shape
+                logger.info(f"Sheet '{sheet_name}': {rows} rows x {cols} columns")
+                segments.extend(_table_segments(
+                    f"Excel File: {os.path.basename(file_path)}, Sheet: {sheet_name}",
+                    df, {'sheet': str(sheet_name)}, self.table_group_chars
+                ))
             
-            for sheet_name in xls.sheet_names:
-                try:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
-                    rows, cols = df.shape
-                    logger.info(f"Sheet '{sheet_name}': {rows} rows x {cols} columns")
-                    
-                    sheet_content = f"Sheet: {sheet_name}\n{df.to_string(index=False)}\n"
-                    sheets_text.append(sheet_content)
-                except Exception as e:
-                    logger.error(f"Error reading sheet '{sheet_name}': {e}")
-            
-            content = f"Excel File: {os.path.basename(file_path)}\n\n" + "\n\n".join(sheets_text)
-            logger.info(f"Successfully read Excel: {file_path} ({len(content)} characters)")
-            return content
+            logger.info(f"Successfully read Excel: {file_path} ({len(segments)} row groups)")
         except Exception as e:
             logger.error(f"Error reading Excel {file_path}: {e}")
-            return ""
+        return segments
+    
+    def read_excel(self, file_path: str) -> str:
+        """Read Excel files and convert to text"""
+        return "\n\n".join(segment['content'] for segment in self.read_excel_segments(file_path))
     
     def read_docx(self, file_path: str) -> str:
         """Read Word documents"""
@@ -154,7 +257,12 @@ class DocumentProcessor:
         
         if ext in self.supported_extensions:
             try:
-                content = self.supported_extensions[ext](file_path)
+                segments = None
+                if ext in self.segment_readers:
+                    segments = self.segment_readers[ext](file_path)
+                    content = "\n\n".join(segment['content'] for segment in segments)
+                else:
+                    content = self.supported_extensions[ext](file_path)
                 if content:
                     logger.info(f"  ✓ Successfully processed {file_path}")
                     result = {
@@ -163,6 +271,9 @@ class DocumentProcessor:
                         'type': ext,
                         'path': file_path
                     }
+                    if segments:
+                        # Parts (e.g. PDF pages) to chunk separately, each with its own metadata
+                        result['segments'] = segments
                     logger.info(f"  Document info: {len(content)} characters, type: {ext}")
                     return result
                 else:
@@ -174,7 +285,91 @@ class DocumentProcessor:
         
         return None
     
-    def process_directory(self, directory: str) -> List[Dict[str, str]]:
+    def process_files(self, file_paths: List[str], workers: int = 1,
+                      timeout: Optional[float] = None) -> Tuple[List[Optional[Dict[str, str]]], List[str]]:
+        """
+        Process several files, optionally in a pool of worker processes.
+
+        Returns the documents in the same order as ``file_paths`` (``None`` where
+        nothing could be extracted) and the paths that failed because their
+        worker timed out or died. ``timeout`` is per file and only enforced
+        when ``workers`` > 1.
+        """
+        if workers <= 1 or len(file_paths) <= 1:
+            return [self.process_file(path) for path in file_paths], []
+        
+        workers = min(workers, len(file_paths))
+        logger.info(f"Extracting {len(file_paths)} files with {workers} worker processes")
+        
+        results = [None] * len(file_paths)
+        failed = []
+        finished = queue.Queue()
+        pending = list(reversed(range(len(file_paths))))
+        in_flight = {}  # index -> start time
+        stuck = 0       # workers still busy with a file we gave up on
+        generation = 0
+        
+        # Spawn rather than fork: the server process has threads of its own
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(processes=workers, initializer=_init_worker,
+                            initargs=(self.table_group_chars, self.csv_block_rows))
+        try:
+            while pending or in_flight:
+                # Keep at most one file per free worker in flight so the
+                # timeout is measured from when extraction actually starts
+                while pending and len(in_flight) + stuck < workers:
+                    index = pending.pop()
+                    in_flight[index] = time.monotonic()
+                    pool.apply_async(
+                        _extract_in_worker, (file_paths[index],),
+                        callback=lambda doc, i=index, g=generation: finished.put((g, i, doc)),
+                        error_callback=lambda exc, i=index, g=generation: finished.put((g, i, exc))
+                    )
+                
+                wait = None
+                if timeout:
+                    wait = max(0.0, min(in_flight.values()) + timeout - time.monotonic())
+                try:
+                    result_generation, index, outcome = finished.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    for index, started in list(in_flight.items()):
+                        if now - started >= timeout:
+                            logger.error(f"  ✗ Timed out after {timeout}s extracting {file_paths[index]}")
+                            del in_flight[index]
+                            failed.append(file_paths[index])
+                            stuck += 1
+                    if stuck >= workers:
+                        # Every worker is hung: replace the pool to get them back
+                        logger.warning("All extraction workers are hung, restarting the pool")
+                        pool.terminate()
+                        pool = context.Pool(processes=workers, initializer=_init_worker,
+                                            initargs=(self.table_group_chars, self.csv_block_rows))
+                        generation += 1
+                        stuck = 0
+                    continue
+                
+                if result_generation != generation:
+                    continue
+                if index not in in_flight:
+                    # A timed-out file finished late; its worker is free again
+                    stuck -= 1
+                    continue
+                
+                del in_flight[index]
+                if isinstance(outcome, BaseException):
+                    logger.error(f"  ✗ Worker failed on {file_paths[index]}: {outcome}")
+                    failed.append(file_paths[index])
+                else:
+                    results[index] = outcome
+        finally:
+            pool.terminate()
+            pool.join()
+        
+        return results, failed
+    
+    def process_directory(self, directory: str, workers: int = 1,
+                          timeout: Optional[float] = None) -> List[Dict[str, str]]:
         """Process all supported files in a directory"""
         documents = []
         
@@ -184,9 +379,11 @@ class DocumentProcessor:
             logger.error(f"Directory does not exist: {directory}")
             return documents
         
-        files = os.listdir(directory)
+        # Sorted so the result order does not depend on the filesystem
+        files = sorted(os.listdir(directory))
         logger.info(f"Found {len(files)} items in directory")
         
+        file_paths = []
         for filename in files:
             file_path = os.path.join(directory, filename)
             
@@ -200,9 +397,10 @@ class DocumentProcessor:
                 logger.info(f"Skipping hidden file: {filename}")
                 continue
             
-            doc = self.process_file(file_path)
-            if doc:
-                documents.append(doc)
+            file_paths.append(file_path)
+        
+        results, _ = self.process_files(file_paths, workers=workers, timeout=timeout)
+        documents = [doc for doc in results if doc]
         
         logger.info(f"Successfully processed {len(documents)} out of {len(files)} items")
         
@@ -215,4 +413,4 @@ class DocumentProcessor:
         else:
             logger.warning("No documents were successfully processed")
         
-        return documents
\ No newline at end of file
+        return documents
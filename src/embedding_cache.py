@@ -0,0 +1,119 @@
+"""
+Persistent, content-addressed cache of chunk embeddings.
+
+Vectors are stored as float32 blobs in SQLite, keyed by a hash of the
+embedding model and the chunk text, so re-ingesting unchanged text (or
+re-chunking into identical pieces) never calls the embedding API again.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Stay well below SQLite's limit on bound parameters per statement
+_QUERY_BATCH_SIZE = 500
+
+
+def embedding_model_name(embeddings) -> str:
+    """Name identifying the model behind an embeddings object."""
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores document vectors on disk and reuses them."""
+
+    def __init__(self, embeddings: Embeddings, path: str, max_entries: int):
+        self.embeddings = embeddings
+        self.model = embedding_model_name(embeddings)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Cumulative counters, read by the ingestion stage for throughput reporting
+        self.usage = {"reused": 0, "embedded": 0, "embedded_chars": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache at {path} holds {self._count} vectors")
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).digest()
+
+    def _load(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Fetch cached vectors and mark them as recently used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), _QUERY_BATCH_SIZE):
+                batch = keys[start:start + _QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", [now] + batch
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, keys: List[bytes], vectors: List[List[float]]):
+        """Save new vectors, evicting the least recently used ones beyond the cap."""
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in zip(keys, vectors)]
+        with self._lock:
+            cursor = self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._count += cursor.rowcount
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                logger.info(f"Evicted {excess} vectors from the embedding cache")
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, only sending those not in the cache to the wrapped model."""
+        keys = [self._key(text) for text in texts]
+        found = self._load(list(set(keys)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        reused = sum(1 for key in keys if key in found)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self._store(list(missing), vectors)
+            found.update(zip(missing, vectors))
+
+        with self._lock:
+            self.usage["reused"] += reused
+            self.usage["embedded"] += len(missing)
+            self.usage["embedded_chars"] += sum(len(text) for text in missing.values())
+        logger.debug(f"Embedding cache: {reused} of {len(texts)} chunks reused, {len(missing)} embedded")
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are not cached."""
+        return self.embeddings.embed_query(text)
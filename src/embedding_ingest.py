@@ -0,0 +1,108 @@
+"""
+Rate-aware embedding of chunks during ingestion.
+
+Chunks are embedded in fixed-size batches with a bounded number of requests
+in flight. Rate limits (429), server errors and connection failures are
+retried with exponential backoff. When the wrapped embeddings are the
+on-disk cache, every finished batch is stored immediately, so a build that
+still fails resumes from the last good batch on the next run.
+"""
+import random
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from .embedding_cache import embedding_model_name
+
+logger = logging.getLogger(__name__)
+
+try:
+    import openai
+    _TRANSIENT_ERRORS = (openai.RateLimitError, openai.APIConnectionError,
+                         openai.APITimeoutError, openai.InternalServerError)
+except ImportError:
+    _TRANSIENT_ERRORS = ()
+
+# Rough OpenAI rule of thumb, used for throughput reporting only
+_CHARS_PER_TOKEN = 4
+
+# Never wait longer than this between two attempts (seconds)
+_MAX_RETRY_DELAY = 60.0
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """Whether an embedding request error is worth retrying."""
+    if isinstance(exc, _TRANSIENT_ERRORS + (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that batches, parallelizes and retries document embedding."""
+
+    def __init__(self, embeddings: Embeddings, batch_size: int, max_parallel: int,
+                 max_retries: int, retry_base_delay: float):
+        self.embeddings = embeddings
+        self.model = embedding_model_name(embeddings)
+        self.batch_size = max(1, batch_size)
+        self.max_parallel = max(1, max_parallel)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+    def _embed_batch(self, batch_number: int, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying transient failures with exponential backoff."""
+        attempt = 0
+        while True:
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    logger.error(f"Embedding batch {batch_number} failed after {attempt + 1} attempts: {e}")
+                    raise
+                # Full jitter so parallel batches don't retry in lockstep
+                delay = random.uniform(0, min(_MAX_RETRY_DELAY, self.retry_base_delay * 2 ** attempt))
+                attempt += 1
+                logger.warning(f"Embedding batch {batch_number} failed ({e}), "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches with up to max_parallel requests in flight."""
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        usage = getattr(self.embeddings, "usage", None)
+        before = dict(usage) if usage is not None else None
+        started = time.monotonic()
+
+        if len(batches) == 1 or self.max_parallel == 1:
+            results = [self._embed_batch(i, batch) for i, batch in enumerate(batches)]
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(self.max_parallel, len(batches)),
+                                          thread_name_prefix="embed")
+            try:
+                futures = [executor.submit(self._embed_batch, i, batch) for i, batch in enumerate(batches)]
+                results = [future.result() for future in futures]
+            finally:
+                # After a batch gives up, don't start the ones still queued
+                executor.shutdown(cancel_futures=True)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        if before is not None:
+            embedded = usage["embedded"] - before["embedded"]
+            embedded_chars = usage["embedded_chars"] - before["embedded_chars"]
+        else:
+            embedded = len(texts)
+            embedded_chars = sum(len(text) for text in texts)
+        logger.info(f"Embedded {len(texts)} chunks in {len(batches)} batches in {elapsed:.2f}s "
+                    f"({embedded} sent to the model: {embedded / elapsed:.1f} chunks/s, "
+                    f"~{embedded_chars / _CHARS_PER_TOKEN / elapsed:.0f} tokens/s)")
+
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
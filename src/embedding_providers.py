@@ -0,0 +1,104 @@
+"""
+Embedding backends, selected with EMBEDDING_PROVIDER.
+
+"openai" calls the embeddings endpoint at OPENAI_BASE_URL. "hashing" computes
+vectors in-process with NumPy: nothing to download, no network, and a query
+is embedded in microseconds, at the cost of matching terms rather than
+meaning.
+"""
+import math
+import zlib
+import logging
+from collections import Counter
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from .config import OPENAI_API_KEY, OPENAI_BASE_URL, EMBEDDING_PROVIDER, HASHING_EMBEDDING_DIMENSIONS
+from .lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Character n-grams help with inflections and Arabic affixes, but count less than whole words
+_CHAR_NGRAM = 3
+_CHAR_NGRAM_WEIGHT = 0.5
+
+# Texts hashed into one matrix at a time
+_BATCH_SIZE = 256
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashing embeddings computed in-process.
+
+    Words (normalized like the BM25 index), adjacent word pairs and character
+    trigrams are hashed into ``dimensions`` signed buckets with sublinear term
+    weights, and each vector is L2-normalized. A text always gets the same
+    vector, whatever else is indexed, so incremental syncs stay consistent.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+        # Part of the index settings and the embedding cache key
+        self.model = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> Counter:
+        """Feature counts of a text; character n-grams are marked with a leading "#"."""
+        words = tokenize(text)
+        features = Counter(words)
+        features.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            features.update("#" + padded[i:i + _CHAR_NGRAM] for i in range(len(padded) - _CHAR_NGRAM + 1))
+        return features
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                # crc32 rather than hash(): string hashes differ between processes
+                digest = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dimensions)
+                # The top bit picks a sign so colliding features tend to cancel out
+                weight = (1.0 + math.log(count)) * (_CHAR_NGRAM_WEIGHT if feature[0] == "#" else 1.0)
+                values.append(weight if digest >> 31 else -weight)
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(values, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), _BATCH_SIZE):
+            vectors.extend(self._embed_batch(texts[start:start + _BATCH_SIZE]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def is_local(embeddings: Embeddings) -> bool:
+    """Whether the embeddings are computed in-process, with no API to batch, retry or cache."""
+    return isinstance(embeddings, HashingEmbeddings)
+
+
+def build_embeddings() -> Embeddings:
+    """Create the embeddings backend selected by EMBEDDING_PROVIDER."""
+    if EMBEDDING_PROVIDER == "hashing":
+        logger.info(f"Initializing in-process hashing embeddings ({HASHING_EMBEDDING_DIMENSIONS} dimensions)...")
+        return HashingEmbeddings(HASHING_EMBEDDING_DIMENSIONS)
+    if EMBEDDING_PROVIDER != "openai":
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{EMBEDDING_PROVIDER}' (expected 'openai' or 'hashing')")
+
+    logger.info("Initializing OpenAI embeddings...")
+    return OpenAIEmbeddings(
+        openai_api_key=OPENAI_API_KEY,
+        openai_api_base=OPENAI_BASE_URL,
+        # Chunks are far below the model's context length; sending plain text
+        # instead of tiktoken ids also works with OpenAI-compatible servers
+        check_embedding_ctx_length=False
+    )
@@ -0,0 +1,114 @@
+"""
+Manifest of the documents that have been indexed into the vector store.
+
+The manifest records, for every file in the data folder, the size, mtime and
+content hash it had when it was last embedded, plus how many chunks it
+produced. On startup it is compared with the data folder so that only new or
+changed files are re-embedded and chunks of deleted files are removed.
+"""
+import hashlib
+import json
+import os
+import logging
+from typing import Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Read files in 1 MB blocks when hashing
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load the manifest, returning an empty one if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return {"settings": None, "files": {}}
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        manifest.setdefault("settings", None)
+        manifest.setdefault("files", {})
+        return manifest
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Could not read index manifest {path}: {e}")
+        return {"settings": None, "files": {}}
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    """Atomically write the manifest to disk."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(key: str, sha256: str, count: int, start: int = 0) -> List[str]:
+    """Deterministic vector store ids for chunks start..start+count-1 of one version of a file."""
+    prefix = hashlib.sha1(f"{key}\0{sha256}".encode("utf-8")).hexdigest()[:20]
+    return [f"{prefix}-{i}" for i in range(start, start + count)]
+
+
+def list_data_files(directory: str) -> Dict[str, os.stat_result]:
+    """Stat every indexable file in the data folder, keyed by filename."""
+    files = {}
+    if not os.path.isdir(directory):
+        return files
+    for entry in os.scandir(directory):
+        # Skip directories and hidden files, same as DocumentProcessor
+        if entry.name.startswith('.') or not entry.is_file():
+            continue
+        files[entry.name] = entry.stat()
+    return files
+
+
+def plan_sync(manifest: Dict[str, Any], directory: str) -> Tuple[List[Dict[str, Any]], List[str], int]:
+    """
+    Compare the data folder with the manifest.
+
+    Returns ``(changed, deleted, unchanged)`` where ``changed`` holds a new
+    manifest entry (plus ``key`` and ``path``) for every new or modified file,
+    ``deleted`` the manifest keys whose file is gone and ``unchanged`` the
+    number of files that need no work. Files are only hashed when their size
+    or mtime differ from the manifest.
+    """
+    known = manifest["files"]
+    changed = []
+    unchanged = 0
+
+    current = list_data_files(directory)
+    for key in sorted(current):
+        stat = current[key]
+        path = os.path.join(directory, key)
+        entry = known.get(key)
+
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            unchanged += 1
+            continue
+
+        sha256 = hash_file(path)
+        if entry and entry["sha256"] == sha256:
+            # Touched but not modified: refresh the fingerprint, keep the chunks
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            unchanged += 1
+            continue
+
+        changed.append({
+            "key": key,
+            "path": path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        })
+
+    deleted = sorted(key for key in known if key not in current)
+    return changed, deleted, unchanged
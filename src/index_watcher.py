@@ -0,0 +1,110 @@
+"""
+Background watcher that applies changes in the data folder to the live index.
+
+Uses watchfiles (inotify and friends) when it is installed and falls back to
+polling the folder otherwise. A burst of changes, such as a large file being
+copied in, is debounced into a single incremental sync.
+"""
+import os
+import threading
+import time
+import logging
+from typing import Iterator
+
+from .config import WATCH_DEBOUNCE, WATCH_POLL_INTERVAL
+from .index_manifest import list_data_files
+from .rag_engine import refresh_index, _get_data_dir
+
+logger = logging.getLogger(__name__)
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+_stop = threading.Event()
+_thread = None
+
+
+def _is_document(path: str) -> bool:
+    """Ignore hidden and temporary files, same as the index."""
+    return not os.path.basename(path).startswith('.')
+
+
+def _snapshot(data_dir: str):
+    return {name: (stat.st_size, stat.st_mtime_ns) for name, stat in list_data_files(data_dir).items()}
+
+
+def _watch_events(data_dir: str) -> Iterator[None]:
+    """Yield once per debounced batch of file system events."""
+    for changes in watchfiles.watch(
+        data_dir,
+        watch_filter=lambda change, path: _is_document(path),
+        debounce=int(WATCH_DEBOUNCE * 1000),
+        stop_event=_stop,
+        recursive=False
+    ):
+        logger.info(f"Data folder changed: {len(changes)} file events")
+        yield
+
+
+def _poll(data_dir: str) -> Iterator[None]:
+    """Yield whenever the folder listing changed and then stayed unchanged for the debounce time."""
+    last = _snapshot(data_dir)
+    while not _stop.wait(WATCH_POLL_INTERVAL):
+        current = _snapshot(data_dir)
+        if current == last:
+            continue
+        # Wait for writes in progress to settle
+        while not _stop.wait(WATCH_DEBOUNCE):
+            settled = _snapshot(data_dir)
+            if settled == current:
+                break
+            current = settled
+        last = current
+        logger.info("Data folder changed")
+        yield
+
+
+def _sync():
+    try:
+        started = time.monotonic()
+        stats = refresh_index()
+        if stats and (stats["changed"] or stats["deleted"]):
+            logger.info(f"Index sync took {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Error updating the index from the data folder: {e}")
+
+
+def _run(data_dir: str):
+    events = _watch_events(data_dir) if watchfiles else _poll(data_dir)
+    # Pick up anything that changed between the startup sync and now
+    _sync()
+    for _ in events:
+        _sync()
+
+
+def start_watcher():
+    """Start watching the data folder in a background thread."""
+    global _thread
+    if _thread is not None:
+        return
+    data_dir = _get_data_dir()
+    if not os.path.isdir(data_dir):
+        logger.warning(f"Data directory '{data_dir}' does not exist, not watching it")
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, args=(data_dir,), name="index-watcher", daemon=True)
+    _thread.start()
+    logger.info(f"Watching {data_dir} for document changes "
+                f"({'file system events' if watchfiles else f'polling every {WATCH_POLL_INTERVAL}s'})")
+
+
+def stop_watcher():
+    """Stop the watcher and wait for a sync in progress to finish."""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join()
+    _thread = None
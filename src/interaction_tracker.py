@@ -1,35 +1,236 @@
 """
 Track user interactions with the chatbot.
+
+Interactions are appended to JSONL segment files in an append-only log.
+record_interaction only buffers the record in memory; a background writer
+thread appends buffered records in batches, periodically and on shutdown.
+
+Per-token counts, last activity and hourly/daily buckets are kept as
+rollups that are advanced incrementally from the log, so statistics never
+re-read the whole history.
 """
+import atexit
 import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Any
 
-# Path to interactions database file
+logger = logging.getLogger(__name__)
+
+# Directory holding the append-only interaction log segments
+INTERACTIONS_LOG_DIR = "db/interactions"
+
+# Legacy JSON interactions file, imported into the log once
 INTERACTIONS_DB_PATH = "db/interactions.json"
 
+# Segment holding the imported legacy interactions; sorts before all others
+LEGACY_SEGMENT_NAME = "0000000000000-legacy.jsonl"
+
+# Start a new segment once the current one reaches this size
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+
+# Flush buffered interactions at least this often (seconds), or sooner once this many are waiting
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH_SIZE = 500
+
+# Rollups persisted next to the log, and how often the writer saves them (seconds)
+ROLLUPS_PATH = os.path.join(INTERACTIONS_LOG_DIR, "rollups.json")
+ROLLUPS_SAVE_INTERVAL = 30.0
+
+_pending: List[Dict[str, Any]] = []
+_pending_lock = threading.Lock()
+
+# Held while appending to the log, and by readers so they never miss
+# or double count a batch that is being written
+_flush_lock = threading.Lock()
+
+_flush_requested = threading.Event()
+_writer = None
+_segment_path = None
+_log_ready = False
+_init_lock = threading.Lock()
+
+# Rollups of everything in the log up to "offsets" (bytes read per segment)
+_rollups = None
+_rollups_lock = threading.Lock()
+_rollups_saved_at = 0.0
+
 def _ensure_db_exists():
-    """Make sure the interactions database file exists."""
-    os.makedirs(os.path.dirname(INTERACTIONS_DB_PATH), exist_ok=True)
-    if not os.path.exists(INTERACTIONS_DB_PATH):
-        with open(INTERACTIONS_DB_PATH, "w") as f:
-            json.dump({}, f)
-
-def _load_interactions() -> Dict[str, List[Dict[str, Any]]]:
-    """Load all interactions from database."""
+    """Make sure the log directory exists and legacy interactions are imported."""
+    global _log_ready
+    if _log_ready:
+        return
+    with _init_lock:
+        if _log_ready:
+            return
+        os.makedirs(INTERACTIONS_LOG_DIR, exist_ok=True)
+        legacy_segment = os.path.join(INTERACTIONS_LOG_DIR, LEGACY_SEGMENT_NAME)
+        if os.path.exists(INTERACTIONS_DB_PATH) and not os.path.exists(legacy_segment):
+            try:
+                with open(INTERACTIONS_DB_PATH, "r") as f:
+                    legacy = json.load(f)
+            except json.JSONDecodeError:
+                legacy = {}
+            # Write under a private name first so other processes never see a partial file
+            tmp_path = f"{legacy_segment}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for token, user_interactions in legacy.items():
+                    for interaction in user_interactions:
+                        f.write(json.dumps({"token": token, **interaction}, default=str, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, legacy_segment)
+        _log_ready = True
+
+def _segment_files() -> List[str]:
+    """All log segments, oldest first."""
     _ensure_db_exists()
-    try:
-        with open(INTERACTIONS_DB_PATH, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {}
-
-def _save_interactions(interactions: Dict[str, List[Dict[str, Any]]]):
-    """Save interactions to database."""
+    names = sorted(name for name in os.listdir(INTERACTIONS_LOG_DIR) if name.endswith(".jsonl"))
+    return [os.path.join(INTERACTIONS_LOG_DIR, name) for name in names]
+
+def _current_segment() -> str:
+    """Segment this process appends to, rotated when it gets too large."""
+    global _segment_path
+    if _segment_path is None or os.path.getsize(_segment_path) >= SEGMENT_MAX_BYTES:
+        # Timestamp first so segments sort chronologically; pid so processes never share a file
+        name = f"{int(time.time() * 1000):013d}-{os.getpid()}.jsonl"
+        _segment_path = os.path.join(INTERACTIONS_LOG_DIR, name)
+        open(_segment_path, "a").close()
+    return _segment_path
+
+def _flush_log():
+    """Append all buffered interactions to the log."""
+    with _flush_lock:
+        with _pending_lock:
+            batch = _pending[:]
+        if not batch:
+            return
+        _ensure_db_exists()
+        lines = "".join(json.dumps(record, default=str, ensure_ascii=False) + "\n" for record in batch)
+        with open(_current_segment(), "a", encoding="utf-8") as f:
+            f.write(lines)
+        with _pending_lock:
+            del _pending[:len(batch)]
+
+def _empty_rollups() -> Dict[str, Any]:
+    return {"offsets": {}, "total": 0, "tokens": {}, "hourly": {}, "daily": {}}
+
+def _load_rollups() -> Dict[str, Any]:
+    """Load persisted rollups, or start from scratch (replaying the whole log once)."""
     _ensure_db_exists()
-    with open(INTERACTIONS_DB_PATH, "w") as f:
-        json.dump(interactions, f, default=str)
+    if os.path.exists(ROLLUPS_PATH):
+        try:
+            with open(ROLLUPS_PATH, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            pass
+    return _empty_rollups()
+
+def _apply_to_rollups(rollups: Dict[str, Any], record: Dict[str, Any]):
+    """Count one interaction in the rollups."""
+    timestamp = str(record["timestamp"])
+    user = rollups["tokens"].setdefault(record["token"], {"count": 0, "last_activity": None})
+    user["count"] += 1
+    if user["last_activity"] is None or timestamp > user["last_activity"]:
+        user["last_activity"] = timestamp
+    rollups["total"] += 1
+    # Timestamps look like "2025-05-08 09:49:33.052866"
+    rollups["hourly"][timestamp[:13]] = rollups["hourly"].get(timestamp[:13], 0) + 1
+    rollups["daily"][timestamp[:10]] = rollups["daily"].get(timestamp[:10], 0) + 1
+
+def _refresh_rollups():
+    """Fold log lines written since the last refresh, by any process, into the rollups."""
+    global _rollups
+    with _rollups_lock:
+        if _rollups is None:
+            _rollups = _load_rollups()
+        offsets = _rollups["offsets"]
+        for path in _segment_files():
+            name = os.path.basename(path)
+            offset = offsets.get(name, 0)
+            if os.path.getsize(path) <= offset:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            # Only consume complete lines; a writer may be mid-append
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    _apply_to_rollups(_rollups, json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    continue
+            offsets[name] = offset + end
+
+def _save_rollups():
+    """Persist the rollups next to the log."""
+    global _rollups_saved_at
+    with _rollups_lock:
+        if _rollups is None:
+            return
+        tmp_path = f"{ROLLUPS_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_rollups, f)
+        os.replace(tmp_path, ROLLUPS_PATH)
+        _rollups_saved_at = time.monotonic()
+
+def _current_rollups() -> Dict[str, Any]:
+    """Up-to-date rollups including interactions still in the buffer."""
+    with _flush_lock:
+        _refresh_rollups()
+        with _rollups_lock:
+            rollups = json.loads(json.dumps(_rollups))
+        with _pending_lock:
+            pending = _pending[:]
+    for record in pending:
+        _apply_to_rollups(rollups, record)
+    return rollups
+
+def flush_interactions():
+    """Append all buffered interactions to the log and persist the rollups."""
+    _flush_log()
+    _refresh_rollups()
+    _save_rollups()
+
+def _writer_loop():
+    """Background thread flushing the buffer periodically."""
+    while True:
+        _flush_requested.wait(FLUSH_INTERVAL)
+        _flush_requested.clear()
+        try:
+            _flush_log()
+            _refresh_rollups()
+            if time.monotonic() - _rollups_saved_at >= ROLLUPS_SAVE_INTERVAL:
+                _save_rollups()
+        except Exception:
+            logger.exception("Error writing interactions")
+
+def _start_writer():
+    """Start the background writer on first use."""
+    global _writer
+    if _writer is None:
+        _writer = threading.Thread(target=_writer_loop, name="interaction-writer", daemon=True)
+        _writer.start()
+        atexit.register(flush_interactions)
+
+def _read_log() -> List[Dict[str, Any]]:
+    """Every recorded interaction, including ones not flushed yet."""
+    records = []
+    with _flush_lock:
+        for path in _segment_files():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn last line from a crash mid-write
+                        continue
+        with _pending_lock:
+            records.extend(_pending)
+    # Segments of different processes interleave in time
+    records.sort(key=lambda record: str(record["timestamp"]))
+    return records
 
 def record_interaction(token: str, question: str, answer: str):
     """Record a user interaction."""
@@ -37,47 +238,59 @@ def record_interaction(token: str, question: str, answer: str):
         # Don't record interactions without a token
         return
     
-    interactions = _load_interactions()
-    
-    # Initialize token history if not exists
-    if token not in interactions:
-        interactions[token] = []
-    
-    # Add the new interaction
-    interactions[token].append({
-        "timestamp": datetime.now(),
-        "question": question,
-        "answer": answer
-    })
-    
-    _save_interactions(interactions)
+    with _pending_lock:
+        _pending.append({
+            "token": token,
+            "timestamp": str(datetime.now()),
+            "question": question,
+            "answer": answer
+        })
+        _start_writer()
+        if len(_pending) >= FLUSH_BATCH_SIZE:
+            _flush_requested.set()
 
 def get_user_interactions(token: str) -> List[Dict[str, Any]]:
     """Get all interactions for a specific token."""
-    interactions = _load_interactions()
-    return interactions.get(token, [])
+    return [
+        {"timestamp": r["timestamp"], "question": r["question"], "answer": r["answer"]}
+        for r in _read_log() if r["token"] == token
+    ]
 
 def get_all_interactions() -> Dict[str, List[Dict[str, Any]]]:
     """Get all interactions for all users."""
-    return _load_interactions()
+    interactions = {}
+    for r in _read_log():
+        interactions.setdefault(r["token"], []).append(
+            {"timestamp": r["timestamp"], "question": r["question"], "answer": r["answer"]}
+        )
+    return interactions
+
+def count_user_interactions(token: str) -> int:
+    """Get the number of interactions for a specific token."""
+    with _flush_lock:
+        _refresh_rollups()
+        with _rollups_lock:
+            count = _rollups["tokens"].get(token, {}).get("count", 0)
+        with _pending_lock:
+            count += sum(1 for record in _pending if record["token"] == token)
+    return count
 
 def get_interaction_stats() -> Dict[str, Any]:
     """Get statistics about interactions."""
-    interactions = _load_interactions()
-    
-    total_users = len(interactions)
-    total_interactions = sum(len(user_interactions) for user_interactions in interactions.values())
+    rollups = _current_rollups()
     
     users_stats = []
-    for token, user_interactions in interactions.items():
+    for token, user in rollups["tokens"].items():
         users_stats.append({
             "token": token[:8] + "...",  # Truncate for privacy
-            "interaction_count": len(user_interactions),
-            "last_activity": max(interaction["timestamp"] for interaction in user_interactions) if user_interactions else None
+            "interaction_count": user["count"],
+            "last_activity": user["last_activity"]
         })
     
     return {
-        "total_users": total_users,
-        "total_interactions": total_interactions,
-        "users": users_stats
+        "total_users": len(rollups["tokens"]),
+        "total_interactions": rollups["total"],
+        "users": users_stats,
+        "hourly": rollups["hourly"],
+        "daily": rollups["daily"]
     }
\ No newline at end of file
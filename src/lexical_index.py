@@ -0,0 +1,114 @@
+"""
+In-process BM25 index over the chunks in the vector store.
+
+Exact terms such as article numbers, license classes and legal vocabulary in
+English or Arabic are often ranked low by embedding similarity; a lexical
+index finds them without calling the embedding API.
+"""
+import math
+import re
+import time
+import unicodedata
+import logging
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Words, optionally joined by . - / (e.g. "3.1", "class-a", "2023/12")
+_TOKEN_PATTERN = re.compile(r"\w+(?:[./-]\w+)*")
+_COMPOUND_SEPARATORS = re.compile(r"[./-]")
+
+# Arabic diacritics and tatweel carry no meaning for matching; letter variants
+# are folded and Arabic-Indic digits mapped to ASCII so "١٢" matches "12"
+_ARABIC_MARKS = re.compile(r"[\u064B-\u0652\u0670\u0640]")
+_ARABIC_LETTERS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه",
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+})
+
+# Chunks fetched from the vector store per request while building
+_LOAD_BATCH_SIZE = 5000
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized terms; compounds also yield their parts."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _ARABIC_MARKS.sub("", text).translate(_ARABIC_LETTERS)
+    terms = []
+    for match in _TOKEN_PATTERN.findall(text):
+        terms.append(match)
+        if _COMPOUND_SEPARATORS.search(match):
+            terms.extend(part for part in _COMPOUND_SEPARATORS.split(match) if part)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents."""
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for i, doc in enumerate(documents):
+            terms = tokenize(doc.page_content)
+            lengths[i] = len(terms)
+            for term, count in Counter(terms).items():
+                doc_ids, counts = postings[term]
+                doc_ids.append(i)
+                counts.append(count)
+
+        # term -> (document indexes, term frequencies, idf)
+        count = len(documents)
+        self._postings = {
+            term: (np.array(doc_ids, dtype=np.int32), np.array(counts, dtype=np.float32),
+                   math.log(1 + (count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5)))
+            for term, (doc_ids, counts) in postings.items()
+        }
+        average = lengths.mean() if count else 0.0
+        # Length normalization part of the BM25 denominator, per document
+        self._norms = k1 * (1 - b + b * lengths / average) if average else np.full(count, k1, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """The k best matching documents with their scores, best first."""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, counts, idf = posting
+            scores[doc_ids] += idf * counts * (self.k1 + 1) / (counts + self._norms[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(self.documents[i], float(scores[i])) for i in matched]
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        """Build the index from every chunk stored in a Chroma collection."""
+        started = time.monotonic()
+        documents = []
+        offset = 0
+        while True:
+            batch = vectorstore.get(include=["documents", "metadatas"], limit=_LOAD_BATCH_SIZE, offset=offset)
+            documents.extend(
+                Document(page_content=text, metadata=metadata or {})
+                for text, metadata in zip(batch["documents"], batch["metadatas"])
+            )
+            if len(batch["ids"]) < _LOAD_BATCH_SIZE:
+                break
+            offset += _LOAD_BATCH_SIZE
+        index = cls(documents)
+        logger.info(f"Built lexical index over {len(index)} chunks "
+                    f"({len(index._postings)} terms) in {time.monotonic() - started:.2f}s")
+        return index
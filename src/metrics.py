@@ -0,0 +1,212 @@
+"""
+Minimal in-process metrics, rendered in the Prometheus text format.
+
+Recording a value is a dict update under a lock, so instrumenting the
+request path costs next to nothing. Metrics are kept per process; with
+several workers each one reports its own.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Seconds; from sub-millisecond token checks up to slow LLM answers
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable] = None):
+        """
+        ``function``, if given, is called at render time and returns the value,
+        or a dict of label value tuples to values for labelled metrics.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _current(self) -> Dict[Tuple[str, ...], float]:
+        if self.function is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.function()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Request path metrics
+stage_seconds = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent per request stage (token_validation, retrieval, llm, llm_first_token, "
+    "interaction_write, ask_total, ask_stream_total)",
+    ["stage"]
+)
+questions_total = Counter("rag_questions_total", "Questions received", ["endpoint"])
+errors_total = Counter("rag_question_errors_total", "Questions that failed", ["endpoint"])
+questions_in_flight = Gauge("rag_questions_in_flight", "Questions being answered right now")
+coalesced_total = Counter("rag_coalesced_questions_total",
+                          "Questions that joined an identical question already in flight")
+
+
+class StageTimer(BaseCallbackHandler):
+    """Callback handler observing retrieval and LLM durations of chain runs."""
+
+    def __init__(self):
+        # run id -> (stage, start time, or None for runs nested in one of the same stage)
+        self._started = {}
+        self._streaming = set()
+
+    def _start(self, run_id, parent_run_id, stage: str):
+        parent = self._started.get(parent_run_id)
+        nested = parent is not None and parent[0] == stage
+        self._started[run_id] = (stage, None if nested else time.perf_counter())
+
+    def _end(self, run_id):
+        self._streaming.discard(run_id)
+        stage, started = self._started.pop(run_id, (None, None))
+        if started is not None:
+            stage_seconds.observe(time.perf_counter() - started, stage=stage)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, parent_run_id, "llm")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._streaming:
+            return
+        self._streaming.add(run_id)
+        stage, started = self._started.get(run_id, (None, None))
+        if started is not None:
+            stage_seconds.observe(time.perf_counter() - started, stage="llm_first_token")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+# Shared by every chain call; runs are told apart by their run id
+stage_timer = StageTimer()
@@ -38,6 +38,15 @@ class HealthResponse(BaseModel):
             }
         }
 
+class ReadinessResponse(BaseModel):
+    """Response model for the readiness check."""
+    ready: bool = Field(..., description="Whether questions can be answered")
+    state: str = Field(..., description="Index state: building, updating, ready or failed")
+    files: int = Field(..., description="Number of indexed files")
+    chunks: int = Field(..., description="Number of chunks in the index")
+    last_sync: Optional[str] = Field(None, description="When the index was last brought up to date")
+    error: Optional[str] = Field(None, description="Why the last index build failed")
+
 class Token(BaseModel):
     """Model for access tokens."""
     token: str = Field(..., description="Unique access token")
@@ -70,4 +79,6 @@ class InteractionStatsResponse(BaseModel):
     """Response model for interaction statistics."""
     total_users: int
     total_interactions: int
-    users: List[UserStats]
\ No newline at end of file
+    users: List[UserStats]
+    hourly: Dict[str, int] = Field(default_factory=dict, description="Interactions per hour (YYYY-MM-DD HH)")
+    daily: Dict[str, int] = Field(default_factory=dict, description="Interactions per day (YYYY-MM-DD)")
\ No newline at end of file
@@ -0,0 +1,399 @@
+"""
+Vector store keeping chunk embeddings in one memory-mapped matrix.
+
+For the small corpora this service indexes, an exact search (one matrix
+product over unit vectors) is faster than going through a vector database
+client, and opening the index is a memory map plus reading one side file.
+
+The searched matrix is float32, or quantized to float16 (half the size) or
+int8 with one scale per vector (a quarter). A quantized index can keep a
+float32 copy on disk that only the best candidates of a search are read
+from, to rank them by their exact score.
+
+Files in the index directory:
+    current.json          generation, vector size and precision, replaced atomically
+    vectors-<gen>.<type>  one row per chunk (f32, f16 or i8), appended to
+    scales-<gen>.f32      int8 only: the scale of each row
+    exact-<gen>.f32       quantized with rescoring only: float32 rows
+    chunks-<gen>.jsonl    log of added chunks (id, text, metadata) and deleted ids
+
+Deleted chunks keep their rows until dead rows outnumber live ones; then
+all files are rewritten as the next generation.
+"""
+import json
+import os
+import threading
+import uuid
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Compact once at least this many rows are dead (and they outnumber the live ones)
+_COMPACT_MIN_DEAD_ROWS = 1000
+
+# Chunks per log line when rewriting the log
+_LOG_BATCH_SIZE = 1000
+
+# Precision of the searched matrix: row type and file extension
+_PRECISIONS = {"float32": (np.float32, "f32"), "float16": (np.float16, "f16"), "int8": (np.int8, "i8")}
+
+# Quantized rows converted to float32 at a time when searching
+_SEARCH_BLOCK_ROWS = 256
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Rows in the given precision, and for int8 the scale that maps each row back."""
+    if precision != "int8":
+        return vectors.astype(_PRECISIONS[precision][0]), None
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    return np.rint(vectors / scales[:, None]).astype(np.int8), scales
+
+
+class _View(NamedTuple):
+    """A consistent snapshot of the index for searches."""
+    matrix: np.ndarray
+    scales: Optional[np.ndarray]
+    exact: Optional[np.ndarray]
+    alive: np.ndarray
+    texts: List[str]
+    metadatas: List[dict]
+    ids: List[str]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Cosine similarity search over a memory-mapped matrix of unit vectors.
+
+    Quantized rows are converted to float32 block by block on every search
+    (NumPy has no integer or fast float16 matrix product), so float16 and int8
+    trade search time for memory; see the "quantization" benchmark.
+
+    ``precision`` and ``rescore_factor`` apply to a new index; an existing one
+    keeps the layout it was built with until ``delete_collection``. With a
+    quantized precision and ``rescore_factor`` n, the n * k best chunks by
+    quantized score are ranked again by their exact score.
+
+    Safe for one writer thread and any number of concurrent searches; other
+    processes may open the same directory to search it.
+    """
+
+    def __init__(self, embedding: Embeddings, path: str, precision: str = "float32", rescore_factor: int = 0):
+        if precision not in _PRECISIONS:
+            raise ValueError(f"Unknown vector precision '{precision}' (expected one of {', '.join(_PRECISIONS)})")
+        self._embedding = embedding
+        self.path = path
+        self._new_precision = precision
+        self._rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _file(self, kind: str, generation: Optional[int] = None) -> str:
+        if kind == "current":
+            return os.path.join(self.path, "current.json")
+        generation = self._generation if generation is None else generation
+        extension = {"vectors": _PRECISIONS[self._precision][1], "chunks": "jsonl"}.get(kind, "f32")
+        return os.path.join(self.path, f"{kind}-{generation}.{extension}")
+
+    def _layout(self) -> List[Tuple[str, Any, Tuple[int, ...]]]:
+        """Files with one entry per row: kind, type and shape of an entry."""
+        dimensions = self._dimensions or 0
+        layout = [("vectors", _PRECISIONS[self._precision][0], (dimensions,))]
+        if self._precision == "int8":
+            layout.append(("scales", np.float32, ()))
+        if self._exact:
+            layout.append(("exact", np.float32, (dimensions,)))
+        return layout
+
+    def _encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        """Unit vectors as the entries of each row file."""
+        matrix, scales = _quantize(vectors, self._precision)
+        return {"vectors": matrix, "scales": scales, "exact": vectors}
+
+    def _load(self):
+        """Read the current generation from disk."""
+        self._generation = 0
+        self._dimensions = None
+        self._precision = self._new_precision
+        self._exact = self._precision != "float32" and self._rescore_factor > 0
+        if os.path.exists(self._file("current")):
+            with open(self._file("current"), "r") as f:
+                current = json.load(f)
+            self._generation = current["generation"]
+            self._dimensions = current["dimensions"]
+            # Indexes written before quantization was supported have neither key
+            self._precision = current.get("precision", "float32")
+            self._exact = current.get("exact", False)
+
+        ids, texts, metadatas, alive = [], [], [], []
+        self._row_of = {}
+        # Bytes of complete log lines; a torn last line is cut off before the next write,
+        # and rows written for it are overwritten
+        self._log_size = 0
+        if os.path.exists(self._file("chunks")):
+            with open(self._file("chunks"), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._log_size += len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    # Rows are numbered in the order chunks were added
+                    for chunk in record.get("add", []):
+                        self._mark_dead(alive, chunk["id"])
+                        self._row_of[chunk["id"]] = len(ids)
+                        ids.append(chunk["id"])
+                        texts.append(chunk["text"])
+                        metadatas.append(chunk["metadata"])
+                        alive.append(True)
+                    for chunk_id in record.get("delete", []):
+                        self._mark_dead(alive, chunk_id)
+                        self._row_of.pop(chunk_id, None)
+        self._rows = len(ids)
+        self._ids, self._texts, self._metadatas = ids, texts, metadatas
+        self._set_view(np.array(alive, dtype=bool))
+
+    def _mark_dead(self, alive: List[bool], chunk_id: str):
+        row = self._row_of.get(chunk_id)
+        if row is not None:
+            alive[row] = False
+
+    def _set_view(self, alive: np.ndarray):
+        """Publish a consistent snapshot for searches."""
+        arrays = {"scales": None, "exact": None}
+        for kind, dtype, shape in self._layout():
+            if self._rows:
+                arrays[kind] = np.memmap(self._file(kind), dtype=dtype, mode="r", shape=(self._rows,) + shape)
+            else:
+                arrays[kind] = np.zeros((0,) + shape, dtype=dtype)
+        self._alive = alive
+        self._view = _View(arrays["vectors"], arrays["scales"], arrays["exact"],
+                           alive, self._texts, self._metadatas, self._ids)
+
+    def _write_current(self):
+        tmp_path = f"{self._file('current')}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"generation": self._generation, "dimensions": self._dimensions,
+                       "precision": self._precision, "exact": self._exact}, f)
+        os.replace(tmp_path, self._file("current"))
+
+    def _append_log(self, record: Dict[str, Any]):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self._file("chunks"), "ab") as f:
+            f.truncate(self._log_size)
+            f.write(line)
+        self._log_size += len(line)
+
+    def __len__(self) -> int:
+        return int(self._view.alive.sum())
+
+    def nbytes(self) -> Dict[str, int]:
+        """Bytes of vector data searched (held in memory) and stored on disk."""
+        sizes = {kind: self._rows * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+                 for kind, dtype, shape in self._layout()}
+        return {"searched": sizes["vectors"] + sizes.get("scales", 0), "disk": sum(sizes.values())}
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and store texts; an existing id is replaced."""
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        vectors = _normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            if self._dimensions is None:
+                self._dimensions = vectors.shape[1]
+                self._write_current()
+            elif vectors.shape[1] != self._dimensions:
+                raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions, the index has {self._dimensions}")
+
+            start = self._rows
+            # Rows first: rows not yet in the log are ignored, and overwritten by the next add
+            entries = self._encode(vectors)
+            for kind, dtype, shape in self._layout():
+                mode = "r+b" if os.path.exists(self._file(kind)) else "wb"
+                with open(self._file(kind), mode) as f:
+                    f.seek(start * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+                    f.write(entries[kind].tobytes())
+                    f.truncate()
+            self._append_log({"add": [
+                {"id": chunk_id, "text": text, "metadata": metadata}
+                for chunk_id, text, metadata in zip(ids, texts, metadatas)
+            ]})
+
+            alive = np.concatenate([self._alive, np.ones(len(texts), dtype=bool)])
+            for row, chunk_id in enumerate(ids, start=start):
+                previous = self._row_of.get(chunk_id)
+                if previous is not None:
+                    alive[previous] = False
+                self._row_of[chunk_id] = row
+            # Searches only look at rows of the matrix they started with, so extending in place is safe
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            self._metadatas.extend(metadatas)
+            self._rows += len(texts)
+            self._set_view(alive)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            rows = [self._row_of.pop(chunk_id) for chunk_id in ids if chunk_id in self._row_of]
+            if not rows:
+                return True
+            self._append_log({"delete": [self._ids[row] for row in rows]})
+            alive = self._alive.copy()
+            alive[rows] = False
+            self._set_view(alive)
+            dead = self._rows - int(alive.sum())
+            if dead >= _COMPACT_MIN_DEAD_ROWS and dead > self._rows - dead:
+                self._compact()
+        return True
+
+    def _compact(self):
+        """Rewrite the live rows as the next generation."""
+        view = self._view
+        live = np.flatnonzero(view.alive)
+        old_generation = self._generation
+        generation = old_generation + 1
+        logger.info(f"Compacting vector index: {len(live)} live of {self._rows} rows")
+
+        arrays = {"vectors": view.matrix, "scales": view.scales, "exact": view.exact}
+        for kind, _, _ in self._layout():
+            with open(self._file(kind, generation), "wb") as f:
+                for start in range(0, len(live), _LOG_BATCH_SIZE):
+                    f.write(np.ascontiguousarray(arrays[kind][live[start:start + _LOG_BATCH_SIZE]]).tobytes())
+        ids = [self._ids[row] for row in live]
+        texts = [self._texts[row] for row in live]
+        metadatas = [self._metadatas[row] for row in live]
+        with open(self._file("chunks", generation), "wb") as f:
+            for start in range(0, len(live), _LOG_BATCH_SIZE):
+                record = {"add": [
+                    {"id": ids[row], "text": texts[row], "metadata": metadatas[row]}
+                    for row in range(start, min(start + _LOG_BATCH_SIZE, len(live)))
+                ]}
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._log_size = f.tell()
+
+        self._generation = generation
+        self._write_current()
+        # Processes that still map the old generation keep reading it until they reopen
+        for kind, _, _ in self._layout() + [("chunks", None, None)]:
+            os.remove(self._file(kind, old_generation))
+        self._ids, self._texts, self._metadatas = ids, texts, metadatas
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._rows = len(ids)
+        self._set_view(np.ones(len(ids), dtype=bool))
+
+    def delete_collection(self):
+        """Remove every chunk and the index files."""
+        with self._lock:
+            for kind in [kind for kind, _, _ in self._layout()] + ["chunks", "current"]:
+                if os.path.exists(self._file(kind)):
+                    os.remove(self._file(kind))
+            self._load()
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: int = 0, **kwargs: Any) -> Dict[str, Any]:
+        """Stored chunks in insertion order, in the shape Chroma's ``get`` returns."""
+        include = include or ["documents", "metadatas"]
+        view = self._view
+        if ids is None:
+            rows = np.flatnonzero(view.alive)
+        else:
+            rows = np.array([self._row_of[chunk_id] for chunk_id in ids if chunk_id in self._row_of], dtype=np.intp)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        result = {"ids": [view.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [view.texts[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [view.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            if view.exact is not None:
+                result["embeddings"] = np.array(view.exact[rows])
+            else:
+                result["embeddings"] = view.matrix[rows].astype(np.float32)
+                if view.scales is not None:
+                    result["embeddings"] *= view.scales[rows][:, None]
+        return result
+
+    def _scores(self, view: _View, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query to every row, as precise as the searched matrix."""
+        if view.matrix.dtype == np.float32:
+            return view.matrix @ query
+        # BLAS only multiplies floats; converting a block at a time keeps the copy small
+        scores = np.empty(len(view.matrix), dtype=np.float32)
+        for start in range(0, len(view.matrix), _SEARCH_BLOCK_ROWS):
+            block = view.matrix[start:start + _SEARCH_BLOCK_ROWS].astype(np.float32)
+            np.dot(block, query, out=scores[start:start + len(block)])
+        if view.scales is not None:
+            scores *= view.scales
+        return scores
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """The k most similar chunks with their cosine similarity, best first."""
+        view = self._view
+        live = int(view.alive.sum())
+        k = min(k, live)
+        if k <= 0:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        scores = self._scores(view, query)
+        scores[~view.alive] = -np.inf
+        rescore = view.exact is not None and self._rescore_factor > 0
+        candidates = min(k * self._rescore_factor, live) if rescore else k
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        if rescore:
+            # In file order, so the float32 rows are read front to back
+            top.sort()
+            scores[top] = view.exact[top] @ query
+            top = top[np.argpartition(-scores[top], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(id=view.ids[row], page_content=view.texts[row], metadata=dict(view.metadatas[row])),
+             float(scores[row]))
+            for row in top
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] to a relevance score in [0, 1]; quantized scores can overshoot a little
+        return lambda score: min(1.0, max(0.0, (score + 1) / 2))
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, path: str = "db/numpy_index", precision: str = "float32",
+                   rescore_factor: int = 0, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, path, precision=precision, rescore_factor=rescore_factor)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -2,17 +2,41 @@
 RAG (Retrieval-Augmented Generation) engine implementation.
 """
 # Update these imports
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.prompts import format_document
 from .config import (OPENAI_API_KEY, MODEL_NAME, TEMPERATURE, 
                     DOCUMENT_PATH, DB_PATH, CHUNK_SIZE, CHUNK_OVERLAP,
-                    OPENAI_BASE_URL)
+                    OPENAI_BASE_URL, INDEX_MANIFEST_PATH,
+                    EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, PDF_PARALLEL_MIN_PAGES,
+                    TABLE_GROUP_CHARS, CSV_BLOCK_ROWS, CSV_STREAM_MIN_BYTES,
+                    LLM_MAX_CONCURRENCY, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL,
+                    ANSWER_CACHE_SIMILARITY, EMBEDDING_CACHE_PATH,
+                    EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_BATCH_SIZE,
+                    EMBEDDING_MAX_PARALLEL, EMBEDDING_MAX_RETRIES,
+                    EMBEDDING_RETRY_BASE_DELAY, RETRIEVAL_MODE, RETRIEVAL_K,
+                    RETRIEVAL_CANDIDATES, CONTEXT_TOKEN_BUDGET, INDEX_READ_ONLY,
+                    VECTOR_STORE, VECTOR_PRECISION, VECTOR_RESCORE_FACTOR)
 from .document_processors import DocumentProcessor
+from .index_manifest import load_manifest, save_manifest, plan_sync, chunk_ids
+from .answer_cache import AnswerCache, normalize_question
+from .embedding_cache import CachedEmbeddings, embedding_model_name
+from .embedding_ingest import BatchedEmbeddings
+from .embedding_providers import build_embeddings, is_local
+from .numpy_vectorstore import NumpyVectorStore
+from .lexical_index import BM25Index
+from .retrievers import HybridRetriever, ContextPacker
+from .metrics import Counter, Gauge, stage_timer, coalesced_total
 import os
 import logging
+import asyncio
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,96 +45,269 @@ logger = logging.getLogger(__name__)
 # Global QA chain instance
 qa_chain = None
 
+# Embeddings used by the current index, also used to embed questions for the answer cache
+_embeddings = None
 
-def initialize_qa_system():
-    """Initialize the QA system with all documents in the data folder."""
-    global qa_chain
-    
-    logger.info("Initializing RAG system...")
-    logger.info(f"Using OpenAI base URL: {OPENAI_BASE_URL}")
-    
-    # Initialize document processor
-    doc_processor = DocumentProcessor()
-    
-    # Get the data directory
+# Live vector store and ingestion embeddings, kept for incremental updates
+_vectorstore = None
+_ingestion_embeddings_client = None
+
+# Serializes index syncs (startup and data folder watcher)
+_index_lock = threading.Lock()
+
+# Most chunks passed to the vector store in one add_texts call (Chroma's client may allow fewer)
+_MAX_INSERT_BATCH = 5000
+
+# Index lifecycle, reported by /api/ready. state is "not_started", "building"
+# (nothing to serve yet), "updating" (serving the persisted index while it is
+# brought up to date), "ready" or "failed"
+index_status = {"state": "not_started", "files": 0, "chunks": 0, "last_sync": None, "error": None}
+
+
+Gauge("rag_index_files", "Files in the document index", function=lambda: index_status["files"])
+Gauge("rag_index_chunks", "Chunks in the document index", function=lambda: index_status["chunks"])
+Gauge("rag_answer_cache_entries", "Answers in the answer cache",
+      function=lambda: answer_cache.get_stats()["entries"])
+Counter("rag_answer_cache_lookups_total", "Answer cache lookups by result", ["result"],
+        function=lambda: {(result,): answer_cache.get_stats()[key]
+                          for result, key in (("exact_hit", "exact_hits"), ("semantic_hit", "semantic_hits"),
+                                              ("miss", "misses"))})
+
+
+class IndexNotReadyError(Exception):
+    """Raised when a question arrives before there is an index to answer it from."""
+
+# Answers to recent questions; cleared whenever the index changes
+answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY)
+
+# LLM calls run on their own threads so they never block the event loop,
+# and at most LLM_MAX_CONCURRENCY of them are in flight at once
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Answers being produced right now, by normalized question; identical
+# questions asked meanwhile share them instead of calling the LLM again
+_answers_in_flight: Dict[str, asyncio.Task] = {}
+_streams_in_flight: Dict[str, "_SharedStream"] = {}
+
+# Bump when the chunk text or metadata layout changes so existing indexes get rebuilt
+INDEX_SCHEMA_VERSION = 4
+
+
+def _get_data_dir() -> str:
+    """Resolve the data directory from DOCUMENT_PATH."""
     data_dir = os.path.dirname(DOCUMENT_PATH)
     if not data_dir:
         data_dir = "data"
-    
-    logger.info(f"Processing documents from: {data_dir}")
-    
-    # Check if data directory exists
-    if not os.path.exists(data_dir):
-        logger.error(f"Data directory '{data_dir}' does not exist!")
-        return
-    
-    # List all files in the directory
-    all_files = os.listdir(data_dir)
-    logger.info(f"Found {len(all_files)} files in {data_dir}")
-    
-    # Process all documents in the data folder
-    documents = doc_processor.process_directory(data_dir)
-    
-    # Log which files were successfully processed
-    if documents:
-        logger.info(f"Successfully processed {len(documents)} documents:")
-        for doc in documents:
-            logger.info(f"  ✓ {doc['filename']} ({doc['type']}) - {len(doc['content'])} characters")
-    else:
-        logger.warning("No documents could be processed!")
-        # Create a dummy document to prevent errors
-        documents = [{
-            'filename': 'default.txt',
-            'content': 'No documents available.',
-            'type': '.txt',
-            'path': 'default'
-        }]
-    
-    # Initialize embeddings with custom OpenAI endpoint
-    logger.info("Initializing OpenAI embeddings...")
-    embeddings = OpenAIEmbeddings(
-        openai_api_key=OPENAI_API_KEY,
-        openai_api_base=OPENAI_BASE_URL
+    return data_dir
+
+
+def _ingestion_embeddings(embeddings):
+    """
+    Wrap an embeddings client for ingestion: batched, retried requests on top
+    of the on-disk cache, so every finished batch is kept even if a later one fails.
+    """
+    if is_local(embeddings):
+        # Computed in-process: faster than reading the cache, and nothing to retry
+        return embeddings
+    if EMBEDDING_CACHE_MAX_ENTRIES > 0:
+        embeddings = CachedEmbeddings(embeddings, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+    return BatchedEmbeddings(
+        embeddings,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_parallel=EMBEDDING_MAX_PARALLEL,
+        max_retries=EMBEDDING_MAX_RETRIES,
+        retry_base_delay=EMBEDDING_RETRY_BASE_DELAY
     )
-    
-    # Split documents into chunks
-    logger.info("Splitting documents into chunks...")
+
+
+def _open_vectorstore(embeddings):
+    """Open (or create) the persisted vector store."""
+    if VECTOR_STORE == "numpy":
+        return NumpyVectorStore(embeddings, os.path.join(DB_PATH, "numpy_index"),
+                                precision=VECTOR_PRECISION, rescore_factor=VECTOR_RESCORE_FACTOR)
+    return Chroma(
+        embedding_function=embeddings,
+        persist_directory=DB_PATH
+    )
+
+
+def _index_settings(embeddings) -> dict:
+    """Settings that invalidate every stored chunk when they change."""
+    settings = {
+        "schema": INDEX_SCHEMA_VERSION,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": embedding_model_name(embeddings),
+        "vector_store": VECTOR_STORE,
+    }
+    # Only for quantized numpy indexes, so existing float32 and Chroma indexes are kept
+    if VECTOR_STORE == "numpy" and VECTOR_PRECISION != "float32":
+        settings["vector_precision"] = VECTOR_PRECISION
+        settings["vector_rescore"] = VECTOR_RESCORE_FACTOR > 0
+    return settings
+
+
+def _split_document(doc, text_splitter):
+    """Split a processed document into chunk texts and their metadata."""
+    base_metadata = {'source': doc['filename'], 'type': doc['type']}
+    # Split each segment (e.g. PDF page) on its own so chunks keep its metadata
+    segments = doc.get('segments') or [{'content': doc['content'], 'metadata': {}}]
+    chunks, metadatas = [], []
+    for segment in segments:
+        metadata = {**base_metadata, **segment['metadata']}
+        if segment.get('split', True):
+            # start_index lets the context packer merge neighbouring chunks
+            for chunk in text_splitter.create_documents([segment['content']], [metadata]):
+                chunks.append(chunk.page_content)
+                metadatas.append(chunk.metadata)
+        else:
+            # Already sized to stand alone, e.g. a group of table rows
+            chunks.append(segment['content'])
+            metadatas.append(metadata)
+    return chunks, metadatas
+
+
+def _stream_csv(doc_processor, path: str, text_splitter):
+    """Yield the chunks of a CSV file one block of rows at a time."""
+    doc = {'filename': os.path.basename(path), 'type': '.csv'}
+    for segments in doc_processor.iter_csv_blocks(path):
+        yield _split_document({**doc, 'segments': segments}, text_splitter)
+
+
+def _insert_batch_size(vectorstore) -> int:
+    """Most chunks the vector store accepts in one add_texts call."""
+    client = getattr(vectorstore, "_client", None)
+    if hasattr(client, "get_max_batch_size"):
+        return min(_MAX_INSERT_BATCH, client.get_max_batch_size())
+    return _MAX_INSERT_BATCH
+
+
+def _index_file(vectorstore, manifest, entry, batches) -> Optional[int]:
+    """
+    Add the chunks of a new or changed file, given as (texts, metadatas) batches,
+    then drop the chunks of its previous version and record it in the manifest.
+    Returns the number of chunks added, or None if the file could not be indexed.
+    """
+    key = entry.pop("key")
+    entry.pop("path")
+    added = 0
+    batch_size = _insert_batch_size(vectorstore)
+    # Add the new version before removing the old one so queries never see a gap
+    try:
+        for texts, metadatas in batches:
+            for start in range(0, len(texts), batch_size):
+                count = len(texts[start:start + batch_size])
+                vectorstore.add_texts(
+                    texts=texts[start:start + batch_size],
+                    metadatas=metadatas[start:start + batch_size],
+                    ids=chunk_ids(key, entry["sha256"], count, start=added)
+                )
+                added += count
+    except Exception as e:
+        # Batches embedded so far are cached; the next run picks up from there
+        logger.error(f"  ✗ Could not index {key}, will retry on the next run: {e}")
+        if added:
+            vectorstore.delete(ids=chunk_ids(key, entry["sha256"], added))
+        return None
+    logger.info(f"  Indexed {added} chunks from {key}")
+
+    old = manifest["files"].get(key)
+    if old and old["chunks"]:
+        vectorstore.delete(ids=chunk_ids(key, old["sha256"], old["chunks"]))
+
+    entry["chunks"] = added
+    manifest["files"][key] = entry
+    # Checkpoint after every file so an interrupted run resumes where it stopped
+    save_manifest(INDEX_MANIFEST_PATH, manifest)
+    return added
+
+
+def sync_index(vectorstore, embeddings, data_dir: str):
+    """
+    Bring the vector store in line with the data folder.
+
+    Only files that are new or whose content changed since the last run are
+    extracted and embedded; chunks of modified and deleted files are removed.
+    Returns the (possibly recreated) vector store and a summary dict.
+    """
+    manifest = load_manifest(INDEX_MANIFEST_PATH)
+    settings = _index_settings(embeddings)
+
+    if manifest["settings"] != settings:
+        logger.info("No index manifest or index settings changed, rebuilding the vector store from scratch")
+        vectorstore.delete_collection()
+        vectorstore = _open_vectorstore(embeddings)
+        manifest = {"settings": settings, "files": {}}
+
+    changed, deleted, unchanged = plan_sync(manifest, data_dir)
+    logger.info(f"Index sync: {len(changed)} new/changed, {len(deleted)} deleted, {unchanged} unchanged files")
+
+    # A single changed PDF is extracted in this process, so let it use the page workers
+    doc_processor = DocumentProcessor(pdf_page_workers=EXTRACTION_WORKERS,
+                                      pdf_parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+                                      table_group_chars=TABLE_GROUP_CHARS,
+                                      csv_block_rows=CSV_BLOCK_ROWS)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True
     )
-    
-    # Prepare texts and metadata for vector store
-    texts = []
-    metadatas = []
-    
-    for doc in documents:
-        logger.info(f"Processing chunks for: {doc['filename']}")
-        # Split document into chunks
-        chunks = text_splitter.split_text(doc['content'])
-        texts.extend(chunks)
-        
-        # Add metadata for each chunk
-        for _ in chunks:
-            metadatas.append({
-                'source': doc['filename'],
-                'type': doc['type']
-            })
-        
-        logger.info(f"  Created {len(chunks)} chunks from {doc['filename']}")
-    
-    logger.info(f"Total chunks created: {len(texts)}")
-    
-    # Create vector store
-    logger.info("Creating vector store...")
-    vectorstore = Chroma.from_texts(
-        texts=texts,
-        embedding=embeddings,
-        metadatas=metadatas,
-        persist_directory=DB_PATH
+
+    # Large CSVs are streamed into the index; everything else is extracted
+    # up front so extraction can use all cores
+    streamed = [entry for entry in changed
+                if entry["key"].lower().endswith(".csv") and entry["size"] >= CSV_STREAM_MIN_BYTES]
+    extracted = [entry for entry in changed if entry not in streamed]
+    documents, failed = doc_processor.process_files(
+        [entry["path"] for entry in extracted],
+        workers=EXTRACTION_WORKERS,
+        timeout=EXTRACTION_TIMEOUT
     )
     
-    # Initialize chat model
+    total_chunks = 0
+    for entry, doc in zip(extracted, documents):
+        path = entry["path"]
+        if path in failed:
+            # Leave it out of the manifest so it is retried on the next run
+            continue
+        batches = [_split_document(doc, text_splitter)] if doc else []
+        added = _index_file(vectorstore, manifest, entry, batches)
+        if added is None:
+            failed.append(path)
+        else:
+            total_chunks += added
+
+    for entry in streamed:
+        path = entry["path"]
+        logger.info(f"Streaming {path} ({entry['size']} bytes) in blocks of {CSV_BLOCK_ROWS} rows")
+        added = _index_file(vectorstore, manifest, entry, _stream_csv(doc_processor, path, text_splitter))
+        if added is None:
+            failed.append(path)
+        else:
+            total_chunks += added
+
+    for key in deleted:
+        old = manifest["files"].pop(key)
+        if old["chunks"]:
+            vectorstore.delete(ids=chunk_ids(key, old["sha256"], old["chunks"]))
+        logger.info(f"  Removed {old['chunks']} chunks of deleted file {key}")
+
+    save_manifest(INDEX_MANIFEST_PATH, manifest)
+
+    return vectorstore, {
+        "files": len(manifest["files"]),
+        "changed": len(changed),
+        "deleted": len(deleted),
+        "failed": len(failed),
+        "unchanged": unchanged,
+        "chunks_added": total_chunks,
+        "chunks_total": len(vectorstore),
+    }
+
+
+def _build_qa_chain(vectorstore):
+    """Create the chat model and the retrieval QA chain on top of a vector store."""
     logger.info("Initializing chat model...")
     llm = ChatOpenAI(
         model_name=MODEL_NAME, 
@@ -119,50 +316,391 @@ def initialize_qa_system():
         openai_api_base=OPENAI_BASE_URL
     )
     
-    # Create QA chain
-    logger.info("Creating QA chain...")
-    qa_chain = RetrievalQA.from_chain_type(
+    logger.info(f"Creating QA chain with {RETRIEVAL_MODE} retrieval...")
+    lexical_index = BM25Index.from_vectorstore(vectorstore) if RETRIEVAL_MODE != "vector" else None
+    retriever = HybridRetriever(
+        vectorstore=vectorstore,
+        lexical_index=lexical_index,
+        mode=RETRIEVAL_MODE,
+        k=RETRIEVAL_CANDIDATES if CONTEXT_TOKEN_BUDGET > 0 else RETRIEVAL_K,
+        candidates=RETRIEVAL_CANDIDATES
+    )
+    retriever = ContextPacker(retriever=retriever, token_budget=CONTEXT_TOKEN_BUDGET)
+    return RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),
+        retriever=retriever,
         return_source_documents=True
     )
-    
-    logger.info("RAG system initialized successfully!")
-    
-    # Summary log
+
+
+def _log_summary(stats: Dict[str, Any]):
     logger.info("=== DOCUMENT PROCESSING SUMMARY ===")
-    logger.info(f"Total files found: {len(all_files)}")
-    logger.info(f"Successfully processed: {len(documents)}")
-    logger.info(f"Total text chunks: {len(texts)}")
+    logger.info(f"Indexed files: {stats['files']}")
+    logger.info(f"New/changed files: {stats['changed']}, deleted: {stats['deleted']}, unchanged: {stats['unchanged']}")
+    if stats["failed"]:
+        logger.warning(f"Files that failed and will be retried: {stats['failed']}")
+    logger.info(f"Chunks embedded this run: {stats['chunks_added']}")
+    logger.info(f"Total text chunks: {stats['chunks_total']}")
     logger.info("==================================")
 
+
+def _sync_and_serve(data_dir: str):
+    """Bring the index up to date with the data folder and serve the result."""
+    global qa_chain, _vectorstore
+    started = time.monotonic()
+    try:
+        with _index_lock:
+            # Only re-embed what changed since the last run
+            vectorstore, stats = sync_index(_vectorstore, _ingestion_embeddings_client, data_dir)
+            if not stats["chunks_total"]:
+                logger.warning("No documents could be processed!")
+            
+            qa_chain = _build_qa_chain(vectorstore)
+            _vectorstore = vectorstore
+    except Exception as e:
+        index_status.update(state="failed", error=str(e))
+        raise
+    
+    # Cached answers may cite chunks that changed
+    answer_cache.clear()
+    index_status.update(state="ready", files=stats["files"], chunks=stats["chunks_total"],
+                        last_sync=datetime.now().isoformat(), error=None)
+    
+    logger.info(f"RAG system initialized successfully in {time.monotonic() - started:.1f}s!")
+    _log_summary(stats)
+
+
+def _sync_in_background(data_dir: str):
+    try:
+        _sync_and_serve(data_dir)
+    except Exception as e:
+        logger.error(f"Building the index failed: {e}")
+
+
+def build_index():
+    """Bring the persisted index up to date without serving it, e.g. before starting workers."""
+    data_dir = _get_data_dir()
+    logger.info(f"Building the index from: {data_dir}")
+    if not os.path.exists(data_dir):
+        logger.error(f"Data directory '{data_dir}' does not exist!")
+        return
+    
+    embeddings = _ingestion_embeddings(build_embeddings())
+    with _index_lock:
+        _, stats = sync_index(_open_vectorstore(embeddings), embeddings, data_dir)
+    _log_summary(stats)
+
+
+def _open_read_only():
+    """Serve the persisted index as it is; another process keeps it up to date."""
+    global qa_chain, _embeddings, _vectorstore
+    embeddings = build_embeddings()
+    with _index_lock:
+        _embeddings = embeddings
+        _vectorstore = _open_vectorstore(embeddings)
+        qa_chain = _build_qa_chain(_vectorstore)
+    manifest = load_manifest(INDEX_MANIFEST_PATH)
+    index_status.update(state="ready", files=len(manifest["files"]), chunks=len(_vectorstore))
+    logger.info(f"Opened the index read-only ({index_status['chunks']} chunks)")
+
+
+def initialize_qa_system(background: bool = False):
+    """
+    Initialize the QA system with all documents in the data folder.
+
+    With ``background``, an index persisted by a previous run is served right
+    away (if it was built with the current settings) and brought up to date
+    in a background thread; otherwise this returns once the index is synced.
+    """
+    global qa_chain, _embeddings, _vectorstore, _ingestion_embeddings_client
+    
+    logger.info("Initializing RAG system...")
+    logger.info(f"Using OpenAI base URL: {OPENAI_BASE_URL}")
+    
+    if INDEX_READ_ONLY:
+        _open_read_only()
+        return
+    
+    data_dir = _get_data_dir()
+    logger.info(f"Processing documents from: {data_dir}")
+    
+    # Check if data directory exists
+    if not os.path.exists(data_dir):
+        logger.error(f"Data directory '{data_dir}' does not exist!")
+        index_status.update(state="failed", error=f"Data directory '{data_dir}' does not exist")
+        return
+    
+    embeddings = _ingestion_embeddings(build_embeddings())
+    
+    with _index_lock:
+        _embeddings = embeddings
+        _ingestion_embeddings_client = embeddings
+        _vectorstore = _open_vectorstore(embeddings)
+        index_status.update(state="building")
+        
+        if background:
+            manifest = load_manifest(INDEX_MANIFEST_PATH)
+            chunks = len(_vectorstore)
+            if manifest["settings"] == _index_settings(embeddings) and chunks:
+                logger.info(f"Serving the persisted index ({chunks} chunks) while it is brought up to date")
+                qa_chain = _build_qa_chain(_vectorstore)
+                index_status.update(state="updating", files=len(manifest["files"]), chunks=chunks)
+    
+    if not background:
+        _sync_and_serve(data_dir)
+        return
+    
+    threading.Thread(target=_sync_in_background, args=(data_dir,), name="index-build", daemon=True).start()
+
+
+def get_index_status() -> Dict[str, Any]:
+    """Index state for readiness checks; ready once questions can be answered."""
+    return {**index_status, "ready": qa_chain is not None}
+
+
+def refresh_index() -> Optional[Dict[str, Any]]:
+    """
+    Apply changes in the data folder to the live index, without a restart.
+
+    Only the chunks of added, modified and deleted files are touched, in the
+    collection that is serving queries. Returns the sync summary, or None if
+    the QA system is not initialized.
+    """
+    global qa_chain, _vectorstore
+    if qa_chain is None or INDEX_READ_ONLY:
+        return None
+    
+    with _index_lock:
+        vectorstore, stats = sync_index(_vectorstore, _ingestion_embeddings_client, _get_data_dir())
+        if vectorstore is not _vectorstore or stats["changed"] or stats["deleted"]:
+            # Point the chain at a rebuilt collection and rebuild the lexical index
+            qa_chain = _build_qa_chain(vectorstore)
+            _vectorstore = vectorstore
+    
+    index_status.update(state="ready", files=stats["files"], chunks=stats["chunks_total"],
+                        last_sync=datetime.now().isoformat(), error=None)
+    if stats["changed"] or stats["deleted"]:
+        # Cached answers may cite chunks that changed
+        answer_cache.clear()
+        logger.info(f"Index updated: {stats['changed']} new/changed, {stats['deleted']} deleted, "
+                    f"{stats['failed']} failed files; {stats['chunks_total']} chunks in total")
+    return stats
+
+
+def _collect_sources(source_documents) -> List[str]:
+    """Unique source filenames of the retrieved documents, in retrieval order, with cited pages."""
+    pages = {}
+    for doc in source_documents:
+        source = doc.metadata.get("source")
+        if not source:
+            continue
+        source_pages = pages.setdefault(source, [])
+        page = doc.metadata.get("page")
+        if page is not None and page not in source_pages:
+            source_pages.append(page)
+    return [
+        f"{source} (p. {', '.join(str(page) for page in sorted(source_pages))})" if source_pages else source
+        for source, source_pages in pages.items()
+    ]
+
+
+def _embed_question(question: str) -> List[float]:
+    """Embed a question with the index's embeddings."""
+    return _embeddings.embed_query(question)
+
+
+def format_answer(answer: str, sources: List[str]) -> str:
+    """Append the source list to an answer, as returned to the user."""
+    if sources:
+        answer += f"\n\nSources: {', '.join(sources)}"
+    return answer
+
+
+def _ensure_ready():
+    """Initialize on first use if nobody did; fail fast while the index is being built."""
+    if qa_chain is None and index_status["state"] == "not_started":
+        initialize_qa_system()
+    if qa_chain is None:
+        if index_status["state"] == "building":
+            raise IndexNotReadyError("The document index is still being built, please try again shortly")
+        raise IndexNotReadyError("The document index is not available")
+
+
 def ask_question(question: str) -> str:
     """Ask a question using the RAG system."""
-    global qa_chain
+    _ensure_ready()
     
-    if qa_chain is None:
-        initialize_qa_system()
+    cached, question_vector = answer_cache.lookup(question, embed=_embed_question)
+    if cached is not None:
+        logger.info(f"Answer cache hit: {question}")
+        return format_answer(*cached)
     
     try:
         logger.info(f"Received question: {question}")
-        result = qa_chain({"query": question})
+        result = qa_chain({"query": question}, callbacks=[stage_timer])
         
-        # Get the answer
-        answer = result["result"]
+        # Add source information to the answer
+        sources = _collect_sources(result.get("source_documents") or [])
+        if sources:
+            logger.info(f"Answer sources: {', '.join(sources)}")
         
-        # Optionally add source information
-        if "source_documents" in result and result["source_documents"]:
-            sources = set()
-            for doc in result["source_documents"]:
-                if "source" in doc.metadata:
-                    sources.add(doc.metadata["source"])
-            
-            if sources:
-                answer += f"\n\nSources: {', '.join(sources)}"
-                logger.info(f"Answer sources: {', '.join(sources)}")
+        answer_cache.put(question, result["result"], sources, question_vector)
+        return format_answer(result["result"], sources)
+    except Exception as e:
+        logger.error(f"Error processing question: {str(e)}")
+        raise Exception(f"Error processing your question: {str(e)}")
+
+
+def stream_question(question: str) -> Iterator[Dict[str, Any]]:
+    """
+    Answer a question, yielding ``{"token": ...}`` events as the LLM produces
+    them and a final ``{"sources": [...]}`` event.
+
+    Uses the same retriever, prompt and model as the QA chain.
+    """
+    _ensure_ready()
+    
+    cached, question_vector = answer_cache.lookup(question, embed=_embed_question)
+    if cached is not None:
+        logger.info(f"Answer cache hit: {question}")
+        answer, sources = cached
+        yield {"token": answer}
+        yield {"sources": sources}
+        return
+    
+    try:
+        logger.info(f"Received question (streaming): {question}")
+        # Stick to one chain even if the index is swapped meanwhile
+        chain = qa_chain
+        source_documents = chain.retriever.invoke(question, config={"callbacks": [stage_timer]})
+        
+        # Build the prompt the "stuff" chain would send
+        stuff_chain = chain.combine_documents_chain
+        context = stuff_chain.document_separator.join(
+            format_document(doc, stuff_chain.document_prompt) for doc in source_documents
+        )
+        messages = stuff_chain.llm_chain.prompt.format_prompt(**{
+            stuff_chain.document_variable_name: context,
+            "question": question,
+        }).to_messages()
         
-        return answer
+        parts = []
+        for chunk in stuff_chain.llm_chain.llm.stream(messages, config={"callbacks": [stage_timer]}):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield {"token": chunk.content}
+        
+        sources = _collect_sources(source_documents)
+        if sources:
+            logger.info(f"Answer sources: {', '.join(sources)}")
+        answer_cache.put(question, "".join(parts), sources, question_vector)
+        yield {"sources": sources}
     except Exception as e:
         logger.error(f"Error processing question: {str(e)}")
-        raise Exception(f"Error processing your question: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error processing your question: {str(e)}")
+
+
+def _join_in_flight(in_flight: Dict[str, Any], question: str, start) -> Any:
+    """Return the in-flight work for a question, starting it with ``start()`` if there is none."""
+    key = normalize_question(question)
+    flight = in_flight.get(key)
+    if flight is not None:
+        logger.info(f"Joining in-flight answer: {question}")
+        coalesced_total.inc()
+        return flight
+    flight = start()
+    in_flight[key] = flight
+
+    def forget(done):
+        if in_flight.get(key) is flight:
+            del in_flight[key]
+        # Mark a failure as seen even if every caller has gone away
+        if not done.cancelled():
+            done.exception()
+    flight.add_done_callback(forget)
+    return flight
+
+
+async def _ask_with_slot(question: str) -> str:
+    async with _llm_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_llm_executor, ask_question, question)
+
+
+async def ask_question_async(question: str) -> str:
+    """
+    Ask a question without blocking the event loop.
+
+    Concurrent calls with the same normalized question share one answer.
+    """
+    task = _join_in_flight(_answers_in_flight, question,
+                           lambda: asyncio.ensure_future(_ask_with_slot(question)))
+    # Shielded so a caller that goes away does not cancel the answer for the others
+    return await asyncio.shield(task)
+
+
+async def _stream_with_slot(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """Async version of stream_question; holds one LLM slot for the whole stream."""
+    async with _llm_slots:
+        loop = asyncio.get_running_loop()
+        events = stream_question(question)
+        try:
+            while True:
+                event = await loop.run_in_executor(_llm_executor, next, events, None)
+                if event is None:
+                    break
+                yield event
+        finally:
+            events.close()
+
+
+class _SharedStream:
+    """One streamed answer, replayed from the start to every caller that joins it."""
+
+    def __init__(self, question: str):
+        self.events = []
+        self.error = None
+        self.done = False
+        self._changed = asyncio.Condition()
+        self.task = asyncio.ensure_future(self._produce(question))
+
+    async def _produce(self, question: str):
+        try:
+            async for event in _stream_with_slot(question):
+                self.events.append(event)
+                async with self._changed:
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            async with self._changed:
+                self._changed.notify_all()
+
+    def add_done_callback(self, callback):
+        self.task.add_done_callback(callback)
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.events) or self.done)
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+async def stream_question_async(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the answer to a question without blocking the event loop.
+
+    Concurrent calls with the same normalized question share one LLM stream.
+    """
+    shared = _join_in_flight(_streams_in_flight, question, lambda: _SharedStream(question))
+    async for event in shared.subscribe():
+        yield event
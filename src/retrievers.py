@@ -0,0 +1,154 @@
+"""
+Retrievers used by the QA chain.
+"""
+import math
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .lexical_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# Rough OpenAI rule of thumb for sizing the context
+_CHARS_PER_TOKEN = 4
+
+# Chunks of the same document part this close together are merged
+# (the splitter strips the whitespace between them)
+_MAX_MERGE_GAP = 2
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _merge_spans(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two overlapping or adjacent spans of the same text."""
+    if second["start"] < first["start"]:
+        first, second = second, first
+    text = first["text"]
+    if second["end"] > first["end"]:
+        if second["start"] > first["end"]:
+            text += "\n" + second["text"]
+        else:
+            text += second["text"][first["end"] - second["start"]:]
+    return {
+        "rank": min(first["rank"], second["rank"]),
+        "start": first["start"],
+        "end": max(first["end"], second["end"]),
+        "text": text,
+        "metadata": first["metadata"],
+    }
+
+
+def pack_context(documents: List[Document], token_budget: int) -> List[Document]:
+    """
+    Turn ranked chunks into the context for the LLM.
+
+    Duplicates are dropped, chunks that overlap or touch in the same document
+    part (same metadata apart from ``start_index``) are merged, and the
+    resulting spans are taken by relevance while they fit in ``token_budget``
+    (0: all of them). The most relevant span is always kept.
+    """
+    spans = []
+    groups = {}
+    seen = set()
+    for rank, doc in enumerate(documents):
+        identity = (doc.metadata.get("source"), doc.page_content)
+        if identity in seen:
+            continue
+        seen.add(identity)
+
+        start = doc.metadata.get("start_index")
+        span = {
+            "rank": rank,
+            "start": start,
+            "end": start + len(doc.page_content) if start is not None else None,
+            "text": doc.page_content,
+            "metadata": doc.metadata,
+        }
+        if start is None:
+            spans.append(span)
+            continue
+
+        group = groups.setdefault(tuple(sorted((key, value) for key, value in doc.metadata.items()
+                                               if key != "start_index")), [])
+        for other in list(group):
+            if span["start"] <= other["end"] + _MAX_MERGE_GAP and other["start"] <= span["end"] + _MAX_MERGE_GAP:
+                span = _merge_spans(other, span)
+                group.remove(other)
+                spans.remove(other)
+        group.append(span)
+        spans.append(span)
+
+    packed = []
+    used = 0
+    for span in sorted(spans, key=lambda span: span["rank"]):
+        tokens = estimate_tokens(span["text"])
+        if packed and token_budget and used + tokens > token_budget:
+            continue
+        metadata = dict(span["metadata"])
+        if span["start"] is not None:
+            metadata["start_index"] = span["start"]
+        packed.append(Document(page_content=span["text"], metadata=metadata))
+        used += tokens
+    return packed
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combine vector search and BM25 with reciprocal rank fusion.
+
+    ``mode`` is "vector", "lexical" (no embedding call) or "hybrid", where
+    ``candidates`` results from each side are fused and the best ``k`` kept.
+    """
+
+    vectorstore: Any
+    lexical_index: Optional[BM25Index] = None
+    mode: str = "hybrid"
+    k: int = 3
+    candidates: int = 20
+    # Standard RRF constant; damps the weight of the very first ranks
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self.lexical_index is None or self.mode == "vector":
+            return self.vectorstore.similarity_search(query, k=self.k)
+        if self.mode == "lexical":
+            return [doc for doc, _ in self.lexical_index.search(query, self.k)]
+
+        rankings = [
+            self.vectorstore.similarity_search(query, k=self.candidates),
+            [doc for doc, _ in self.lexical_index.search(query, self.candidates)],
+        ]
+        # Chroma results carry no ids, so a chunk is identified by its source and text
+        documents = {}
+        scores = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking):
+                key = (doc.metadata.get("source"), doc.page_content)
+                documents.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [documents[key] for key in best]
+
+
+class ContextPacker(BaseRetriever):
+    """Retriever that packs the ranked results of another one, into a token budget if one is set."""
+
+    retriever: BaseRetriever
+    token_budget: int
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        candidates = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        packed = pack_context(candidates, self.token_budget)
+        candidate_tokens = sum(estimate_tokens(doc.page_content) for doc in candidates)
+        packed_tokens = sum(estimate_tokens(doc.page_content) for doc in packed)
+        logger.info(f"Packed context: {len(candidates)} chunks (~{candidate_tokens} tokens) into "
+                    f"{len(packed)} passages (~{packed_tokens} tokens, budget {self.token_budget or 'none'})")
+        return packed
@@ -1,15 +1,21 @@
 """
 API routes for the application.
 """
-from src.models import QuestionRequest, AnswerResponse, HealthResponse
-from src.rag_engine import ask_question
-from src.token_store import create_token, revoke_token, get_all_tokens, validate_token
+from src.models import QuestionRequest, AnswerResponse, HealthResponse, ReadinessResponse
+from src.rag_engine import (ask_question_async, stream_question_async, format_answer, answer_cache,
+                            get_index_status, IndexNotReadyError)
+from src.token_store import create_token, revoke_token, get_all_tokens, validate_token, get_token
 from src.models import Token, TokenResponse, InteractionStatsResponse
-from src.interaction_tracker import record_interaction, get_user_interactions, get_interaction_stats
+from src.interaction_tracker import record_interaction, get_user_interactions, get_interaction_stats, count_user_interactions
 from src.admin_auth import verify_admin
+from src.metrics import render_metrics, stage_seconds, questions_total, errors_total, questions_in_flight
 from fastapi import APIRouter, HTTPException, Form, Depends, Request
-from typing import List, Dict
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Dict, Any
 import os
+import json
+import time
 import mimetypes
 from pathlib import Path
 from fastapi import HTTPException
@@ -28,27 +34,107 @@ async def ask_endpoint(req: QuestionRequest, request: Request):
     if not req.question or req.question.strip() == "":
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
+    questions_total.inc(endpoint="ask")
+    questions_in_flight.inc()
+    started = time.perf_counter()
     try:
         # Get token from request
         token = request.query_params.get("token")
         if not token:
             token = request.cookies.get("auth_token")
             
-        # Get answer
-        answer = ask_question(req.question)
+        # Get answer without blocking the event loop
+        answer = await ask_question_async(req.question)
         
         # Record interaction
-        record_interaction(token, req.question, answer)
+        with stage_seconds.time(stage="interaction_write"):
+            await run_in_threadpool(record_interaction, token, req.question, answer)
         
         return {"answer": answer}
+    except IndexNotReadyError as e:
+        errors_total.inc(endpoint="ask")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+        errors_total.inc(endpoint="ask")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        questions_in_flight.dec()
+        stage_seconds.observe(time.perf_counter() - started, stage="ask_total")
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/ask/stream")
+async def ask_stream_endpoint(req: QuestionRequest, request: Request):
+    """
+    Stream the answer as server-sent events while the LLM generates it.
+    
+    Emits ``token`` events with pieces of the answer, a ``sources`` event,
+    then ``done`` once the interaction is recorded (or ``error``).
+    """
+    if not req.question or req.question.strip() == "":
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    # Get token from request
+    token = request.query_params.get("token")
+    if not token:
+        token = request.cookies.get("auth_token")
+    
+    async def event_stream():
+        parts = []
+        sources = []
+        questions_total.inc(endpoint="ask_stream")
+        questions_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            async for event in stream_question_async(req.question):
+                if "token" in event:
+                    parts.append(event["token"])
+                    yield _sse_event("token", {"token": event["token"]})
+                else:
+                    sources = event["sources"]
+                    yield _sse_event("sources", {"sources": sources})
+            
+            # Record the full answer, exactly as /api/ask would return it
+            answer = format_answer("".join(parts), sources)
+            with stage_seconds.time(stage="interaction_write"):
+                await run_in_threadpool(record_interaction, token, req.question, answer)
+            yield _sse_event("done", {})
+        except Exception as e:
+            errors_total.inc(endpoint="ask_stream")
+            yield _sse_event("error", {"detail": str(e)})
+        finally:
+            questions_in_flight.dec()
+            stage_seconds.observe(time.perf_counter() - started, stage="ask_stream_total")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats(admin_user: str = Depends(verify_admin)):
+    """Get answer cache hit/miss counters. Requires admin authentication."""
+    return answer_cache.get_stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(admin_user: str = Depends(verify_admin)):
+    """Metrics in the Prometheus text format. Requires admin authentication."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint to verify the API is running."""
     return {"status": "ok"}
 
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """Readiness check: 200 once questions can be answered, 503 while there is no index to serve."""
+    status = get_index_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 
 
 
@@ -120,8 +206,7 @@ async def get_interaction_count(token: str):
     if not token:
         return {"count": 0}
     
-    interactions = get_user_interactions(token)
-    return {"count": len(interactions)}
+    return {"count": count_user_interactions(token)}
 
 
 
@@ -131,28 +216,14 @@ async def get_token_info(token: str):
     try:
         print(f"[DEBUG] Token info requested for: '{token}'")
         
-        # Get all tokens
-        all_tokens = get_all_tokens()
-        print(f"[DEBUG] Found {len(all_tokens)} tokens in database")
-        
-        # Find the matching token - modified to work with dict objects
-        for t in all_tokens:
-            # Check if t is a dict
-            if isinstance(t, dict):
-                if t.get('token') == token:
-                    print(f"[DEBUG] Token MATCH found for dict! Returning info for: {t.get('customer_name')}")
-                    return {
-                        "customer_name": t.get('customer_name', ''),
-                        "email": t.get('email', '')
-                    }
-            # Handle Token objects (original approach)
-            elif hasattr(t, 'token'):
-                if t.token == token:
-                    print(f"[DEBUG] Token MATCH found for object! Returning info for: {t.customer_name}")
-                    return {
-                        "customer_name": t.customer_name,
-                        "email": t.email
-                    }
+        # Look the token up directly instead of scanning every token
+        t = get_token(token)
+        if t:
+            print(f"[DEBUG] Token MATCH found! Returning info for: {t.get('customer_name')}")
+            return {
+                "customer_name": t.get('customer_name', ''),
+                "email": t.get('email', '')
+            }
         
         # If token not found, return empty data instead of an error
         print(f"[DEBUG] No match found for token: '{token}'")
@@ -1,51 +1,95 @@
 """
 Simple token storage and management.
+
+Tokens are kept in an SQLite database in WAL mode with the token as primary
+key, so validating a token is a single indexed lookup. Tokens from the old
+JSON file are imported once, the first time the database is opened.
 """
 import json
 import os
+import sqlite3
+import threading
 import uuid
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 
 # Path to token database file
-TOKEN_DB_PATH = "db/tokens.json"
+TOKEN_DB_PATH = "db/tokens.sqlite3"
+
+# Legacy JSON token file, imported into the database once
+LEGACY_TOKEN_DB_PATH = "db/tokens.json"
+
+_COLUMNS = ("token", "customer_name", "email", "created_at", "status")
+
+_init_lock = threading.Lock()
+_db_ready = False
+
+# One connection per thread; SQLite connections must not be shared across threads
+_local = threading.local()
 
 def _ensure_db_exists():
-    """Make sure the token database file exists."""
-    os.makedirs(os.path.dirname(TOKEN_DB_PATH), exist_ok=True)
-    if not os.path.exists(TOKEN_DB_PATH):
-        with open(TOKEN_DB_PATH, "w") as f:
-            json.dump([], f)
+    """Make sure the token database exists and legacy tokens are imported."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _init_lock:
+        if _db_ready:
+            return
+        os.makedirs(os.path.dirname(TOKEN_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(TOKEN_DB_PATH, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Serialize initialization between worker processes
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " token TEXT PRIMARY KEY, customer_name TEXT NOT NULL, email TEXT NOT NULL,"
+                " created_at TEXT NOT NULL, status TEXT NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            _import_legacy_tokens(conn)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        _db_ready = True
 
-def _load_tokens() -> List[Dict[str, Any]]:
-    """Load all tokens from database."""
-    _ensure_db_exists()
-    try:
-        with open(TOKEN_DB_PATH, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
+def _import_legacy_tokens(conn: sqlite3.Connection):
+    """Copy tokens from the legacy JSON file into the database, once."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_imported'").fetchone():
+        return
+    tokens = []
+    if os.path.exists(LEGACY_TOKEN_DB_PATH):
+        try:
+            with open(LEGACY_TOKEN_DB_PATH, "r") as f:
+                tokens = json.load(f)
+        except json.JSONDecodeError:
+            tokens = []
+    conn.executemany(
+        "INSERT OR IGNORE INTO tokens VALUES (?, ?, ?, ?, ?)",
+        [tuple(str(t.get(column, "")) for column in _COLUMNS) for t in tokens]
+    )
+    conn.execute("INSERT INTO meta VALUES ('legacy_json_imported', ?)", (str(datetime.now()),))
 
-def _save_tokens(tokens: List[Dict[str, Any]]):
-    """Save tokens to database."""
-    _ensure_db_exists()
-    with open(TOKEN_DB_PATH, "w") as f:
-        json.dump(tokens, f, default=str)
+def _get_connection() -> sqlite3.Connection:
+    """Get this thread's connection to the token database."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        _ensure_db_exists()
+        conn = sqlite3.connect(TOKEN_DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    return conn
 
 def create_token(customer_name: str, email: str) -> Dict[str, str]:
     """Create a new token for a customer."""
     token = str(uuid.uuid4())
     
-    tokens = _load_tokens()
-    tokens.append({
-        "token": token,
-        "customer_name": customer_name,
-        "email": email,
-        "created_at": datetime.now(),
-        "status": "active"
-    })
-    
-    _save_tokens(tokens)
+    conn = _get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO tokens VALUES (?, ?, ?, ?, ?)",
+            (token, customer_name, email, str(datetime.now()), "active")
+        )
     
     # Calculate the full URL (will be completed in routes.py)
     return {
@@ -55,22 +99,24 @@ def create_token(customer_name: str, email: str) -> Dict[str, str]:
 
 def validate_token(token: str) -> bool:
     """Check if a token is valid."""
-    tokens = _load_tokens()
-    for t in tokens:
-        if t["token"] == token and t["status"] == "active":
-            return True
-    return False
+    row = _get_connection().execute(
+        "SELECT 1 FROM tokens WHERE token = ? AND status = 'active'", (token,)
+    ).fetchone()
+    return row is not None
+
+def get_token(token: str) -> Optional[Dict[str, Any]]:
+    """Get a single token record."""
+    row = _get_connection().execute("SELECT * FROM tokens WHERE token = ?", (token,)).fetchone()
+    return dict(row) if row else None
 
 def revoke_token(token: str) -> bool:
     """Revoke a token."""
-    tokens = _load_tokens()
-    for t in tokens:
-        if t["token"] == token:
-            t["status"] = "revoked"
-            _save_tokens(tokens)
-            return True
-    return False
+    conn = _get_connection()
+    with conn:
+        cursor = conn.execute("UPDATE tokens SET status = 'revoked' WHERE token = ?", (token,))
+    return cursor.rowcount > 0
 
 def get_all_tokens() -> List[Dict[str, Any]]:
     """Get all tokens."""
-    return _load_tokens()
\ No newline at end of file
+    rows = _get_connection().execute("SELECT * FROM tokens ORDER BY rowid").fetchall()
+    return [dict(row) for row in rows]
\ No newline at end of file
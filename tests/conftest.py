@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the app's modules as the "src" package, without credentials or telemetry
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -0,0 +1,24 @@
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src import rag_engine
+from src.index_manifest import chunk_ids
+
+
+def test_large_file_is_added_in_batches_the_client_accepts(tmp_path, monkeypatch):
+    store = Chroma(embedding_function=DeterministicFakeEmbedding(size=8), persist_directory=str(tmp_path / "chroma"))
+    monkeypatch.setattr(store._client, "get_max_batch_size", lambda: 4)
+    monkeypatch.setattr(rag_engine, "INDEX_MANIFEST_PATH", str(tmp_path / "index_manifest.json"))
+    add_texts = store.add_texts
+    batch_sizes = []
+    monkeypatch.setattr(store, "add_texts", lambda **kwargs: batch_sizes.append(len(kwargs["texts"])) or add_texts(**kwargs))
+
+    manifest = {"settings": {}, "files": {}}
+    entry = {"key": "large.txt", "path": str(tmp_path / "large.txt"), "sha256": "0123", "size": 1, "mtime": 0}
+    texts = [f"chunk {i}" for i in range(10)]
+    added = rag_engine._index_file(store, manifest, entry, [(texts, [{"source": "large.txt"} for _ in texts])])
+
+    assert added == 10
+    assert batch_sizes == [4, 4, 2]
+    assert sorted(store.get()["ids"]) == sorted(chunk_ids("large.txt", "0123", 10))
+    assert manifest["files"]["large.txt"]["chunks"] == 10
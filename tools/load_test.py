@@ -0,0 +1,275 @@
+"""
+Load generator that replays recorded questions against a running app.
+
+Questions come from the interaction log (db/interactions, or the legacy
+db/interactions.json) and are sent in recorded order to /api/ask,
+/api/ask/stream, /demo and the admin endpoints in a configurable mix. Reports
+p50/p95/p99 latency, throughput and error rate per endpoint.
+
+With --rate, requests arrive at that average rate (Poisson arrivals) whatever
+the server does, and latency is measured from the planned arrival time, so
+requests waiting for one of the --concurrency slots count as slow rather than
+disappearing. Without --rate, --concurrency clients send requests back to back.
+
+Usage, against the OpenAI stand-in:
+    python tools/openai_standin.py --latency 0.5 --token-latency 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stand-in python main.py
+    python tools/load_test.py --rate 20 --concurrency 50 --duration 60 --unique
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+# Runs as a script: make the project's src package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.admin_auth import get_admin_credentials
+
+ADMIN_PATHS = ["/api/token/list", "/api/interactions/stats", "/api/cache/stats"]
+
+
+def load_questions(path: Optional[str] = None) -> List[str]:
+    """Recorded questions, oldest first, from the interaction log or the legacy JSON file."""
+    if path is None:
+        path = "db/interactions" if os.path.isdir("db/interactions") else "db/interactions.json"
+    records = []
+    if os.path.isdir(path):
+        for segment in sorted(glob.glob(os.path.join(path, "*.jsonl"))):
+            with open(segment, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    elif os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for token, interactions in json.load(f).items():
+                records.extend(interactions)
+    records.sort(key=lambda record: str(record.get("timestamp", "")))
+    return [record["question"] for record in records if str(record.get("question", "")).strip()]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "ask=8,demo=1,admin=1" into endpoint weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("ask", "ask_stream", "demo", "admin"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (ask, ask_stream, demo, admin)")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class LoadTest:
+    def __init__(self, args, questions: List[str], token: str):
+        self.args = args
+        self.questions = questions
+        self.token = token
+        self.admin_auth = (args.admin_user, args.admin_password)
+        self.samples = defaultdict(list)
+        self.rng = random.Random(args.seed)
+        self.kinds = list(args.mix)
+        self.weights = [args.mix[kind] for kind in self.kinds]
+        self._slots = asyncio.Semaphore(args.concurrency)
+        self._sequence = itertools.count()
+
+    def _question(self, i: int) -> str:
+        question = self.questions[i % len(self.questions)]
+        # A unique suffix defeats the answer cache and request coalescing
+        return f"{question} (load test {i})" if self.args.unique else question
+
+    async def _ask(self, client: httpx.AsyncClient, i: int) -> Dict[str, Any]:
+        response = await client.post("/api/ask", params={"token": self.token}, json={"question": self._question(i)})
+        return {"endpoint": "ask", "status": response.status_code, "ok": response.status_code == 200}
+
+    async def _ask_stream(self, client: httpx.AsyncClient, i: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        first_token = None
+        event = None
+        async with client.stream("POST", "/api/ask/stream", params={"token": self.token},
+                                 json={"question": self._question(i)}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "token" and first_token is None:
+                        first_token = time.perf_counter() - started
+                    if event in ("done", "error"):
+                        break
+        status = response.status_code if response.status_code != 200 or event == "done" else f"stream {event}"
+        return {"endpoint": "ask_stream", "status": status, "ok": status == 200, "first_token": first_token}
+
+    async def _demo(self, client: httpx.AsyncClient, i: int) -> Dict[str, Any]:
+        response = await client.get("/demo", params={"token": self.token})
+        return {"endpoint": "demo", "status": response.status_code, "ok": response.status_code == 200}
+
+    async def _admin(self, client: httpx.AsyncClient, i: int) -> Dict[str, Any]:
+        path = ADMIN_PATHS[i % len(ADMIN_PATHS)]
+        response = await client.get(path, auth=self.admin_auth)
+        return {"endpoint": f"admin {path}", "status": response.status_code, "ok": response.status_code == 200}
+
+    async def _send(self, client: httpx.AsyncClient, i: int, kind: str, planned: float):
+        send = {"ask": self._ask, "ask_stream": self._ask_stream, "demo": self._demo, "admin": self._admin}[kind]
+        async with self._slots:
+            try:
+                sample = await send(client, i)
+            except httpx.TimeoutException:
+                sample = {"endpoint": kind, "status": "timeout", "ok": False}
+            except httpx.HTTPError as e:
+                sample = {"endpoint": kind, "status": type(e).__name__, "ok": False}
+        sample["latency"] = time.perf_counter() - planned
+        self.samples[sample["endpoint"]].append(sample)
+
+    def _next(self, started: float) -> Optional[int]:
+        """Sequence number of the next request, or None once the run is over."""
+        i = next(self._sequence)
+        if self.args.requests and i >= self.args.requests:
+            return None
+        if self.args.duration and time.perf_counter() - started >= self.args.duration:
+            return None
+        return i
+
+    async def _closed_loop_client(self, client: httpx.AsyncClient, started: float):
+        while (i := self._next(started)) is not None:
+            await self._send(client, i, self.rng.choices(self.kinds, self.weights)[0], time.perf_counter())
+
+    async def run(self) -> float:
+        """Run the load test; returns the elapsed seconds."""
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(base_url=self.args.url, timeout=self.args.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            if self.args.rate:
+                tasks = []
+                planned = started
+                while (i := self._next(started)) is not None:
+                    await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+                    kind = self.rng.choices(self.kinds, self.weights)[0]
+                    tasks.append(asyncio.create_task(self._send(client, i, kind, planned)))
+                    planned += self.rng.expovariate(self.args.rate)
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.gather(*(self._closed_loop_client(client, started)
+                                       for _ in range(self.args.concurrency)))
+            return time.perf_counter() - started
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles (ms), throughput and error breakdown for one endpoint."""
+    latencies = np.array([sample["latency"] for sample in samples]) * 1000
+    errors = defaultdict(int)
+    for sample in samples:
+        if not sample["ok"]:
+            errors[str(sample["status"])] += 1
+    summary = {
+        "requests": len(samples),
+        "throughput": len(samples) / elapsed,
+        "error_rate": sum(errors.values()) / len(samples),
+        "errors": dict(errors),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+    }
+    first_tokens = [sample["first_token"] * 1000 for sample in samples if sample.get("first_token") is not None]
+    if first_tokens:
+        summary["first_token_p50_ms"] = float(np.percentile(first_tokens, 50))
+        summary["first_token_p95_ms"] = float(np.percentile(first_tokens, 95))
+    return summary
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    width = max(len(name) for name in report)
+    print(f"\n{'endpoint':<{width}}  {'requests':>8}  {'req/s':>7}  {'errors':>7}  "
+          f"{'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+    for name, stats in report.items():
+        print(f"{name:<{width}}  {stats['requests']:>8}  {stats['throughput']:>7.1f}  {stats['error_rate']:>7.1%}  "
+              f"{stats['p50_ms']:>8.1f}  {stats['p95_ms']:>8.1f}  {stats['p99_ms']:>8.1f}  {stats['max_ms']:>8.1f}")
+    for name, stats in report.items():
+        if stats["errors"]:
+            print(f"{name} errors: {stats['errors']}")
+        if "first_token_p50_ms" in stats and name != "total":
+            print(f"{name} first token: p50 {stats['first_token_p50_ms']:.1f} ms, "
+                  f"p95 {stats['first_token_p95_ms']:.1f} ms")
+
+
+def _create_token(args) -> str:
+    response = httpx.post(f"{args.url}/api/token/create", auth=(args.admin_user, args.admin_password),
+                          data={"customer_name": "Load test", "email": "load-test@example.com"}, timeout=30)
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def _revoke_token(args, token: str):
+    httpx.post(f"{args.url}/api/token/revoke", auth=(args.admin_user, args.admin_password),
+               data={"token": token}, timeout=30)
+
+
+def main():
+    # Same admin credentials as the app: environment, then .env, then the app's defaults
+    load_dotenv()
+    credentials = get_admin_credentials()
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the running app")
+    parser.add_argument("--interactions", help="interaction log directory or legacy JSON file to replay "
+                                               "(default: db/interactions, else db/interactions.json)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("ask=8,ask_stream=2,demo=1,admin=1"),
+                        help="endpoint weights, e.g. ask=8,ask_stream=2,demo=1,admin=1")
+    parser.add_argument("--concurrency", type=int, default=10, help="maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="average arrivals per second (0: --concurrency clients back to back)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load (0: no limit)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: no limit)")
+    parser.add_argument("--unique", action="store_true",
+                        help="make every question unique so each one reaches the LLM")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per request timeout in seconds")
+    parser.add_argument("--token", help="access token to use (default: create one with the admin API and revoke it)")
+    parser.add_argument("--admin-user", default=credentials["username"], help="default: as the app (ADMIN_USERNAME)")
+    parser.add_argument("--admin-password", default=credentials["password"], help="default: as the app (ADMIN_PASSWORD)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the endpoint mix and arrival times")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("set --duration or --requests")
+
+    questions = load_questions(args.interactions)
+    if not questions:
+        parser.error("no recorded questions found to replay")
+
+    token = args.token or _create_token(args)
+    load = f"{args.rate}/s arrivals" if args.rate else "closed loop"
+    print(f"Replaying {len(questions)} recorded questions against {args.url} "
+          f"({load}, concurrency {args.concurrency}, mix {args.mix})")
+    try:
+        load_test = LoadTest(args, questions, token)
+        elapsed = asyncio.run(load_test.run())
+    finally:
+        if not args.token:
+            _revoke_token(args, token)
+
+    if not load_test.samples:
+        print("No requests were sent")
+        return
+    report = {name: summarize(samples, elapsed) for name, samples in sorted(load_test.samples.items())}
+    all_samples = [sample for samples in load_test.samples.values() for sample in samples]
+    report["total"] = summarize(all_samples, elapsed)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": {key: value for key, value in vars(args).items() if key != "admin_password"},
+                       "elapsed": elapsed, "endpoints": report}, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Local OpenAI-compatible stand-in server for testing without the real API.
+
+Serves deterministic embeddings (the same text always gets the same unit
+vector) and chat completions, plain or streamed, with configurable latency
+and injected 429/500 errors, so ingestion batching, retries, throughput and
+the whole question path can be exercised offline.
+
+Usage:
+    python tools/openai_standin.py --port 8900 --latency 0.05 --error-rate 0.1
+    python tools/openai_standin.py --latency 0.4 --token-latency 0.02 --answer-tokens 80
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 python main.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="OpenAI stand-in")
+
+# Set from the command line in main()
+settings = {
+    "latency": 0.0,
+    "error_rate": 0.0,
+    "dimensions": 1536,
+    "token_latency": 0.0,
+    "answer_tokens": 60,
+}
+
+_FILLER = ("According to the provided documents the insurance authority requires licensed companies "
+           "to follow the applicable regulation and keep their records available for inspection").split()
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str], List[int], List[List[int]]]
+    model: str = "text-embedding-ada-002"
+
+
+class ChatRequest(BaseModel):
+    messages: List[Dict[str, Any]]
+    model: str = "gpt-3.5-turbo"
+    stream: bool = False
+    max_tokens: Optional[int] = None
+
+
+def _as_inputs(value) -> List[str]:
+    """Normalize the request input (text or token ids) to a list of keys."""
+    if isinstance(value, str):
+        return [value]
+    if value and isinstance(value[0], int):
+        return [" ".join(map(str, value))]
+    return [item if isinstance(item, str) else " ".join(map(str, item)) for item in value]
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+async def _simulate_upstream():
+    """Apply the configured latency and randomly fail like a busy upstream."""
+    if settings["latency"]:
+        await asyncio.sleep(settings["latency"])
+    if random.random() < settings["error_rate"]:
+        if random.random() < 0.5:
+            raise HTTPException(status_code=429, detail="Rate limit reached (stand-in)")
+        raise HTTPException(status_code=500, detail="Internal error (stand-in)")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(req: EmbeddingRequest):
+    """OpenAI embeddings endpoint."""
+    await _simulate_upstream()
+    inputs = _as_inputs(req.input)
+    tokens = sum(len(text.split()) for text in inputs)
+    return {
+        "object": "list",
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text, settings["dimensions"])}
+            for i, text in enumerate(inputs)
+        ],
+        "model": req.model,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def fake_answer(messages: List[Dict[str, Any]], max_tokens: Optional[int]) -> List[str]:
+    """Deterministic answer for a conversation, as the pieces a stream would send."""
+    question = str(messages[-1].get("content", "")) if messages else ""
+    # The question is the last line of the stuffed RetrievalQA prompt
+    question = question.strip().splitlines()[-1] if question.strip() else ""
+    count = min(settings["answer_tokens"], max_tokens or settings["answer_tokens"])
+    words = f"Stand-in answer to: {question[:80]}".split() + _FILLER * (count // len(_FILLER) + 1)
+    return [word if i == 0 else " " + word for i, word in enumerate(words[:max(count, 1)])]
+
+
+def _chat_chunk(completion_id: str, model: str, delta: Dict[str, str], finish_reason: Optional[str] = None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(req: ChatRequest):
+    """OpenAI chat completions endpoint; --latency is the time to the first token."""
+    await _simulate_upstream()
+    pieces = fake_answer(req.messages, req.max_tokens)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in req.messages)
+
+    if req.stream:
+        async def stream():
+            yield _chat_chunk(completion_id, req.model, {"role": "assistant", "content": ""})
+            for piece in pieces:
+                if settings["token_latency"]:
+                    await asyncio.sleep(settings["token_latency"])
+                yield _chat_chunk(completion_id, req.model, {"content": piece})
+            yield _chat_chunk(completion_id, req.model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    if settings["token_latency"]:
+        await asyncio.sleep(settings["token_latency"] * len(pieces))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": req.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(pieces)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces),
+                  "total_tokens": prompt_tokens + len(pieces)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/500")
+    parser.add_argument("--dimensions", type=int, default=1536, help="embedding size")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="seconds between streamed answer tokens (for plain answers, added per token)")
+    parser.add_argument("--answer-tokens", type=int, default=60, help="length of chat answers in tokens (words)")
+    args = parser.parse_args()
+
+    settings.update(latency=args.latency, error_rate=args.error_rate, dimensions=args.dimensions,
+                    token_latency=args.token_latency, answer_tokens=args.answer_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()